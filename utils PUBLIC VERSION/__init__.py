@@ -0,0 +1,41 @@
+"""Helpers for parsing, cleaning and topic modelling PubMed search results.
+
+Submodules are imported lazily, on first attribute access, so that e.g.
+
+    from utils import process_pubmed
+
+doesn't pay for matplotlib, fontTools and requests (only needed by 'get_google_font').
+"""
+import importlib
+
+__all__ = [
+    'abbreviation_matcher',
+    'abbreviations',
+    'benchmark',
+    'cleaning_pipeline',
+    'deduplication',
+    'get_google_font',
+    'ingest',
+    'instrumentation',
+    'process_pubmed',
+    'pubmed_field_definitions',
+    'pubmed_schema',
+    'pubmed_xml',
+    'search_index',
+    'synthetic_medline',
+    'topic_probabilities',
+    'topic_rollup',
+]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        module = importlib.import_module(f"{__name__}.{name}")
+        # Cache the submodule on the package so '__getattr__' isn't called for it again.
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,260 @@
+"""Validates the replacement dictionaries in 'abbreviations' and compiles them into a matcher.
+
+The cleaning functions get their compiled patterns from 'load', which compiles them at most once per
+process. Nothing is written to disk: unpickling the compiled patterns recompiles every one of them,
+so a saved matcher loads no faster than it builds. Validate the dictionaries from the directory
+containing the 'utils' package with:
+
+    python -m utils.abbreviation_matcher
+"""
+import argparse
+import ast
+import functools
+import re
+import sys
+
+from . import abbreviations
+
+
+# The dictionary building functions in 'abbreviations' that are validated and compiled.
+DICTIONARIES: list[str] = ['exact_replacements', 'domain_specific_replacements']
+
+
+def abbreviation_pattern(key: str) -> tuple[re.Pattern, str]:
+    """Compiles the pattern, and the replacement template, used to expand a single abbreviation.
+
+    Args:
+        key (str): the abbreviation.
+
+    Returns:
+        tuple[re.Pattern, str]: the compiled pattern and a flag, either 'direct' if the full form
+        replaces the match as is, or 'template' if the full form is wrapped in group references.
+    """
+    if key.lower() == 'on':
+        # Pattern to match 'ON' in uppercase only.
+        return re.compile(r'\bON\b'), 'direct'
+
+    if key == 'al':
+        # Special case handling for 'al' in 'et al.'
+        # Pattern for 'al' that excludes 'et al.' and does not match 'al' as part of another word.
+        # Negative lookbehind to exclude 'al' in 'et al.'
+        return re.compile(r'(?i)(?<!et\s)\bal\b'), 'direct'
+
+    # Regular expression patterns for other cases.
+    # Note that the pattern '(?i)' is an inline flag for re.IGNORECASE - thereby making
+    # the pattern case-insensitive.
+    pattern = re.compile(
+        r'(?i)(\s)' + re.escape(key) + r'\b(?=[.,;-])|' +  # key (with leading space) before punctuation, capture leading space.
+        r'\b' + re.escape(key) + r'\b(\s)|' +              # key surrounded by whitespace, capture trailing space.
+        r'^' + re.escape(key) + r'(\s)\b|' +               # key at the beginning of the sentence (with trailing space), capture trailing space.
+        r'\(' + re.escape(key) + r'\)|'                    # key surrounded by parentheses.
+        r'\[' + re.escape(key) + r'\]'                     # key surrounded by square brackets.
+    )
+    return pattern, 'template'
+
+
+def compile_abbreviations(replacement_dict: dict[str, str]) -> list[tuple[str, re.Pattern, str]]:
+    """Compiles the patterns used by 'cleaning_pipeline.replace_abbreviations'.
+
+    Every pattern can only match text that contains the abbreviation itself, so the lowercase
+    abbreviation is kept alongside the pattern as a cheap substring prefilter.
+
+    Args:
+        replacement_dict (dict[str, str]): dictionary of abbreviations and their full form.
+
+    Returns:
+        list[tuple[str, re.Pattern, str]]: lowercase abbreviation, compiled pattern and replacement
+        string, in dictionary order.
+    """
+    compiled = []
+    for key, value in replacement_dict.items():
+        pattern, kind = abbreviation_pattern(key)
+        # Replace with the full form and the captured whitespace/punctuation.
+        compiled.append((key.lower(), pattern, value if kind == 'direct' else r'\1' + value + r'\2'))
+    return compiled
+
+
+def compile_duplicates(replacement_dict: dict[str, str]) -> list[tuple[str, re.Pattern]]:
+    """Compiles the patterns used by 'cleaning_pipeline.remove_duplicates'.
+
+    Args:
+        replacement_dict (dict[str, str]): dictionary of phrases to remove duplicates of.
+
+    Returns:
+        list[tuple[str, re.Pattern]]: lowercase phrase, used as a substring prefilter, and the compiled
+        pattern, in dictionary order.
+    """
+    # Create a regex pattern to match consecutive duplicates of the phrase.
+    # This pattern uses \b for word boundaries and \s* for optional spaces.
+    return [(phrase.lower(), re.compile(r'(' + re.escape(phrase) + r')\s*\1', re.IGNORECASE)) for phrase in replacement_dict.values()]
+
+
+def compile_domain_terms(replacement_mapping: dict[str, str]) -> list[tuple[str, re.Pattern, str]]:
+    """Compiles the patterns used by 'cleaning_pipeline.unify_terms'.
+
+    Args:
+        replacement_mapping (dict[str, str]): dictionary of term variants and their unified form.
+
+    Returns:
+        list[tuple[str, re.Pattern, str]]: lowercase variant, compiled pattern and unified term, in dictionary order.
+    """
+    return [(variant.lower(), re.compile(re.escape(variant), re.IGNORECASE), unified_term) for variant, unified_term in replacement_mapping.items()]
+
+
+def _dict_literal_items(function_name: str) -> list[tuple[str, str, int]]:
+    """Reads the key/value pairs of the dict literal in one of the 'abbreviations' functions.
+
+    The source is parsed, rather than the function called, because a dict literal silently keeps
+    only the last of any repeated keys.
+
+    Args:
+        function_name (str): name of the function in 'abbreviations'.
+
+    Returns:
+        list[tuple[str, str, int]]: key, value and line number of every entry, in source order.
+    """
+    with open(abbreviations.__file__, 'r', encoding="utf8") as f:
+        tree = ast.parse(f.read())
+
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name == function_name:
+            literal = next(n for n in ast.walk(node) if isinstance(n, ast.Dict))
+            return [
+                (key.value, value.value, key.lineno)
+                for key, value in zip(literal.keys, literal.values)
+                if isinstance(key, ast.Constant) and isinstance(value, ast.Constant)
+            ]
+
+    raise ValueError(f"'abbreviations.{function_name}' not found.")
+
+
+def _shadowed(patterns: list[tuple[str, re.Pattern, str]], keys: list[str]) -> list[tuple[int, int]]:
+    """Finds entries that can never match because an earlier entry rewrites their text first.
+
+    Each key is embedded in a probe sentence which is then passed through all the earlier patterns,
+    in order, exactly as the cleaning functions would. If the key's own pattern stops matching, the
+    earlier entry responsible is reported.
+
+    Args:
+        patterns (list[tuple[str, re.Pattern, str]]): prefilters, compiled patterns and replacements, in dictionary order.
+        keys (list[str]): the dictionary keys, in the same order.
+
+    Returns:
+        list[tuple[int, int]]: (shadowed entry, shadowing entry) index pairs.
+    """
+    shadowed = []
+    for j, key in enumerate(keys):
+        pattern_j = patterns[j][1]
+        probe = f"x {key} x"
+        if not pattern_j.search(probe):
+            continue
+        for i in range(j):
+            _, pattern_i, replacement_i = patterns[i]
+            probe = pattern_i.sub(replacement_i, probe)
+            if not pattern_j.search(probe):
+                shadowed.append((j, i))
+                break
+    return shadowed
+
+
+def validate() -> list[dict[str, str]]:
+    """Validates the replacement dictionaries for duplicate, conflicting and shadowed keys.
+
+    * duplicate: the same key appears more than once in the dict literal (only the last one is kept).
+    * conflict: keys that are equal ignoring case, which is how they are matched, map to different values.
+    * shadowed: an earlier key rewrites the text of a later key, so the later key never matches.
+
+    Returns:
+        list[dict[str, str]]: one dictionary per issue, with the keys 'dictionary', 'kind', 'key' and 'detail'.
+    """
+    issues = []
+    for name in DICTIONARIES:
+        items = _dict_literal_items(name)
+
+        seen: dict[str, tuple[str, int]] = {}
+        for key, value, lineno in items:
+            if key in seen:
+                first_value, first_lineno = seen[key]
+                detail = f"line {lineno} repeats line {first_lineno}"
+                if value != first_value:
+                    detail += f" with a different value ({first_value!r} is overwritten by {value!r})"
+                issues.append({'dictionary': name, 'kind': 'duplicate', 'key': key, 'detail': detail})
+            else:
+                seen[key] = (value, lineno)
+
+        mapping: dict[str, str] = getattr(abbreviations, name)()
+        by_lowercase: dict[str, list[str]] = {}
+        for key in mapping:
+            by_lowercase.setdefault(key.lower(), []).append(key)
+        for variants in by_lowercase.values():
+            values = {mapping[key] for key in variants}
+            if len(values) > 1:
+                detail = ', '.join(f"{key!r} -> {mapping[key]!r}" for key in variants)
+                issues.append({'dictionary': name, 'kind': 'conflict', 'key': variants[0], 'detail': detail})
+
+        keys = list(mapping.keys())
+        patterns = compile_abbreviations(mapping) if name == 'exact_replacements' else compile_domain_terms(mapping)
+        for j, i in _shadowed(patterns, keys):
+            # Entries that map to the same value as the entry shadowing them are harmless.
+            if mapping[keys[j]] == mapping[keys[i]] and keys[j].lower() == keys[i].lower():
+                continue
+            issues.append({
+                'dictionary': name,
+                'kind': 'shadowed',
+                'key': keys[j],
+                'detail': f"{keys[i]!r} -> {mapping[keys[i]]!r} is applied first",
+            })
+
+    return issues
+
+
+def build() -> dict:
+    """Builds the matcher from the current replacement dictionaries.
+
+    The dictionaries are not validated here, see 'validate'.
+
+    Returns:
+        dict: the replacement dictionaries and the compiled patterns of each cleaning function.
+    """
+    exact = abbreviations.exact_replacements()
+    domain = abbreviations.domain_specific_replacements()
+
+    return {
+        'exact_replacements': exact,
+        'domain_specific_replacements': domain,
+        'abbreviation_patterns': compile_abbreviations(exact),
+        'duplicate_patterns': compile_duplicates(exact),
+        'domain_patterns': compile_domain_terms(domain),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def load() -> dict:
+    """Returns the matcher, building it on the first call.
+
+    The matcher is cached, so the patterns are compiled at most once per process and repeated calls
+    (e.g. one per cleaning function) are free.
+
+    Returns:
+        dict: the matcher, as returned by 'build'.
+    """
+    return build()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Validate the replacement dictionaries used by the abbreviation matcher.")
+    parser.add_argument('--strict', action='store_true', help="exit with an error if any issue is found")
+    args = parser.parse_args(argv)
+
+    issues = validate()
+
+    for issue in issues:
+        print(f"{issue['dictionary']}: {issue['kind']} {issue['key']!r}: {issue['detail']}")
+    print(f"{len(issues)} issue(s) found.")
+
+    if args.strict and issues:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
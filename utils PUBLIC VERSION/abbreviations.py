@@ -12,13 +12,10 @@ def domain_specific_replacements() -> dict[str, str]:
         'inceptionResNetV2': 'InceptionResNetV2',
         'inceptionResNet-V2': 'InceptionResNetV2',
         'inceptionResNet-v2': 'InceptionResNetV2',
-        'inceptionResNet-V2': 'InceptionResNetV2',
         'InceptionResNet v2': 'InceptionResNetV2',
         'InceptionResNetv2': 'InceptionResNetV2',
         'InceptionResNet-V2': 'InceptionResNetV2',
         'InceptionResNet-v2': 'InceptionResNetV2',
-        'InceptionResNet-V2': 'InceptionResNetV2',
-        'Inception-ResNet-v2': 'InceptionResNetV2',
         'Inception-ResNet-v2': 'InceptionResNetV2',
         'Inception-ResNet-V2': 'InceptionResNetV2',
         'inception-resnet-v2': 'InceptionResNetV2',
@@ -0,0 +1,434 @@
+"""Benchmark suite for the MEDLINE parser and the cleaning pipeline.
+
+Run from the directory containing the 'utils' package, for example:
+
+    python -m utils.benchmark --sizes 1000 10000 100000 1000000 --output bench.json
+    python -m utils.benchmark --spacy-model en_core_web_sm --output bench_spacy.json
+    python -m utils.benchmark --compare bench_before.json bench_after.json
+    python -m utils.benchmark --stages read read_medline read_medline_gz read_medline_zst --no-memory
+    python -m utils.benchmark --imports
+"""
+import argparse
+import gc
+import gzip
+import importlib.util
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import BinaryIO, Callable
+
+import pandas as pd
+
+from . import abbreviations, cleaning_pipeline, process_pubmed, pubmed_field_definitions, synthetic_medline
+
+
+DEFAULT_SIZES: list[int] = [1_000, 10_000, 100_000, 1_000_000]
+
+# Stages that need a spaCy NLP object. They are skipped unless a spaCy model is provided.
+NLP_STAGES: set[str] = {'split_into_sentences', 'normalize', 'normalize_fast'}
+
+# Compressed copies of the synthetic MEDLINE file read by the compressed input stages, with the
+# extension and the function opening a file for writing compressed data to it.
+COMPRESSED_INPUTS: dict[str, tuple[str, Callable[[str], BinaryIO]]] = {
+    'gzip': ('.gz', lambda filename: gzip.open(filename, 'wb')),
+    'zstd': ('.zst', lambda filename: importlib.import_module('zstandard').open(filename, 'wb')),
+}
+
+# Third party packages that are slow to import. The import benchmark reports which of them each
+# submodule pulls in.
+HEAVY_MODULES: list[str] = ['pandas', 'numpy', 'scipy', 'pyarrow', 'spacy', 'matplotlib', 'fontTools', 'requests']
+
+# Run in a fresh interpreter so that nothing is already in 'sys.modules'.
+_IMPORT_SCRIPT = """
+import importlib, json, sys, time
+sys.path.insert(0, {path!r})
+start = time.perf_counter()
+importlib.import_module({module!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _read_lines(filename: str) -> list[str]:
+    """Reads a MEDLINE file into a list of lines, exactly as the notebook does.
+
+    Args:
+        filename (str): path of the MEDLINE file.
+
+    Returns:
+        list[str]: one entry per line, with NaN for blank lines.
+    """
+    with open(filename, 'r', encoding="utf8") as f:
+        max_line_length: int = max(len(line) for line in f)
+
+    df_raw = pd.read_fwf(filename, header=None, widths=[max_line_length+1], skip_blank_lines=False)
+    return df_raw[0].to_list()
+
+
+def _naive_sentences(abstracts: list[str | None]) -> pd.DataFrame:
+    """Builds a sentence-level DataFrame without spaCy, for benchmarking the sentence-level stages.
+
+    The split only needs to be realistic in size, not linguistically correct, so a regex is enough.
+
+    Args:
+        abstracts (list[str | None]): abstracts as returned by 'synthetic_medline.generate_abstracts'.
+
+    Returns:
+        pd.DataFrame: one row per sentence in column 'Abstract_split', indexed by paper.
+    """
+    df = pd.DataFrame({'Abstract': pd.Series(abstracts, dtype=pd.StringDtype())}).dropna(subset=['Abstract'])
+    df['Abstract_split'] = df['Abstract'].apply(lambda x: re.split(r'(?<=\.)\s+', x))
+    return df.explode('Abstract_split')[['Abstract', 'Abstract_split']].copy(deep=True)
+
+
+def _stages(nlp, replacement_dict: dict[str, str]) -> dict[str, tuple[str, Callable]]:
+    """Returns the benchmarked stages.
+
+    Each stage is mapped to the name of the input it consumes and a function that runs the stage on
+    that input. The inputs are prepared by '_prepare_inputs' and are never shared between stages.
+
+    Args:
+        nlp (_type_): spaCy NLP object, or None.
+        replacement_dict (dict[str, str]): dictionary of abbreviations and their full form.
+
+    Returns:
+        dict[str, tuple[str, Callable]]: stage name to (input name, stage function).
+    """
+    field_dict = pubmed_field_definitions.definitions()
+    col = ['Abstract_split']
+
+    return {
+        'read': ('medline_file', _read_lines),
+        'read_medline': ('medline_file', process_pubmed.read_medline),
+        'read_medline_gz': ('medline_file_gzip', process_pubmed.read_medline),
+        'read_medline_zst': ('medline_file_zstd', process_pubmed.read_medline),
+        'get_data': ('medline_lines', lambda x: process_pubmed.get_data(
+            x, field_dict, pd.DataFrame(columns=list(field_dict.keys()), dtype=pd.StringDtype())
+        )),
+        'split_into_sentences': ('papers', lambda x: cleaning_pipeline.split_into_sentences(['Abstract'], x, nlp)),
+        'to_lowercase': ('sentences', lambda x: cleaning_pipeline.to_lowercase(col, x)),
+        'replace_abbreviations': ('sentences', lambda x: cleaning_pipeline.replace_abbreviations(col, x, replacement_dict)),
+        'remove_duplicates': ('sentences', lambda x: cleaning_pipeline.remove_duplicates(col, x, replacement_dict)),
+        'remove_uppercase_colon_phrases': ('sentences', lambda x: cleaning_pipeline.remove_uppercase_colon_phrases(col, x)),
+        'whitespace': ('sentences', lambda x: cleaning_pipeline.whitespace(col, x)),
+        'normalize': ('sentences', lambda x: cleaning_pipeline.normalize(col, x, nlp)),
+        # A new memo table for every run, so the warm-up is part of the measurement.
+        'normalize_fast': ('sentences', lambda x: cleaning_pipeline.normalize(col, x, nlp, memo=cleaning_pipeline.LemmaMemo())),
+    }
+
+
+def _prepare_inputs(n_records: int, seed: int, workdir: str) -> dict[str, Callable]:
+    """Prepares the stage inputs for one benchmark size.
+
+    Every entry is a factory so that each stage, and each repeat, gets a fresh copy of its input
+    (the cleaning functions modify the DataFrame passed to them). The inputs are built lazily, the
+    first time a stage needs them.
+
+    Args:
+        n_records (int): number of synthetic records.
+        seed (int): seed for the synthetic data generator.
+        workdir (str): directory in which to write the synthetic MEDLINE file.
+
+    Returns:
+        dict[str, Callable]: input name to a zero-argument factory returning the input.
+    """
+    filename = os.path.join(workdir, f"synthetic-{n_records}.txt")
+
+    # Nothing is built until a stage asks for it, and then it is kept for the other stages and
+    # repeats, so e.g. benchmarking only the cleaning stages never writes the MEDLINE file.
+    cache: dict[str, object] = {}
+
+    def cached(key: str, build: Callable[[], object]) -> Callable[[], object]:
+        def get() -> object:
+            if key not in cache:
+                cache[key] = build()
+            return cache[key]
+        return get
+
+    def write_medline() -> str:
+        synthetic_medline.write_medline(filename, n_records, seed)
+        return filename
+
+    def compressed_file(compression: str) -> Callable[[], str]:
+        extension, open_compressed = COMPRESSED_INPUTS[compression]
+
+        def make() -> str:
+            # Streamed, so neither the file nor its compressed copy is ever held in memory.
+            with open(medline_file(), 'rb') as f_in, open_compressed(filename + extension) as f_out:
+                shutil.copyfileobj(f_in, f_out, 2**20)
+            return filename + extension
+        return cached(compression, make)
+
+    medline_file = cached('medline_file', write_medline)
+    # Reading the file is itself a stage, so the parser input is only read if the parser is benchmarked.
+    medline_lines = cached('medline_lines', lambda: _read_lines(medline_file()))
+    abstracts = cached('abstracts', lambda: synthetic_medline.generate_abstracts(n_records, seed))
+    papers = cached('papers', lambda: pd.DataFrame({'Abstract': pd.Series(abstracts(), dtype=pd.StringDtype())}).dropna(subset=['Abstract']))
+    sentences = cached('sentences', lambda: _naive_sentences(abstracts()))
+
+    return {
+        'medline_file': medline_file,
+        'medline_file_gzip': compressed_file('gzip'),
+        'medline_file_zstd': compressed_file('zstd'),
+        'medline_lines': lambda: list(medline_lines()),
+        'papers': lambda: papers().copy(deep=True),
+        'sentences': lambda: sentences().copy(deep=True),
+    }
+
+
+def _rows(obj) -> int:
+    """Returns the number of rows in a stage input or output.
+
+    Args:
+        obj (_type_): a DataFrame, a list of lines or a filename.
+
+    Returns:
+        int: number of rows, or 0 for a filename.
+    """
+    if isinstance(obj, str):
+        return 0
+    return len(obj)
+
+
+def _run_stage(stage_func: Callable, make_input: Callable, repeat: int, measure_memory: bool) -> dict:
+    """Times a single stage and, optionally, measures its peak memory.
+
+    The timed runs are done with tracemalloc switched off, so the memory measurement, which is done
+    in a separate run, doesn't inflate the reported times.
+
+    Args:
+        stage_func (Callable): function running the stage.
+        make_input (Callable): factory returning a fresh input for the stage.
+        repeat (int): number of timed runs. The fastest run is reported.
+        measure_memory (bool): whether to do an extra run under tracemalloc.
+
+    Returns:
+        dict: the measurements for this stage.
+    """
+    times = []
+    for _ in range(repeat):
+        stage_input = make_input()
+        rows_in = _rows(stage_input)
+        gc.collect()
+        start = time.perf_counter()
+        stage_output = stage_func(stage_input)
+        times.append(time.perf_counter() - start)
+        rows_out = _rows(stage_output)
+        del stage_input, stage_output
+
+    result = {
+        'rows_in': rows_in if rows_in else rows_out,
+        'rows_out': rows_out,
+        'seconds': min(times),
+        'seconds_all': times,
+    }
+    result['rows_per_second'] = result['rows_in'] / result['seconds'] if result['seconds'] > 0 else None
+
+    if measure_memory:
+        stage_input = make_input()
+        gc.collect()
+        tracemalloc.start()
+        stage_func(stage_input)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del stage_input
+        result['peak_memory_mb'] = peak / 2**20
+
+    return result
+
+
+def run(sizes: list[int], seed: int = 42, nlp=None, repeat: int = 1, measure_memory: bool = True,
+        max_stage_seconds: float | None = None, stages: list[str] | None = None) -> dict:
+    """Runs the benchmark suite over a range of input sizes.
+
+    A stage that takes longer than 'max_stage_seconds' at one size is not run at larger sizes,
+    which keeps the scaling curves of the quadratic stages from stalling the whole suite.
+
+    Args:
+        sizes (list[int]): numbers of synthetic records to benchmark.
+        seed (int, optional): seed for the synthetic data generator. Defaults to 42.
+        nlp (_type_, optional): spaCy NLP object. The spaCy dependent stages are skipped if None. Defaults to None.
+        repeat (int, optional): number of timed runs per stage. Defaults to 1.
+        measure_memory (bool, optional): whether to measure peak memory. Defaults to True.
+        max_stage_seconds (float | None, optional): time budget per stage run. Defaults to None.
+        stages (list[str] | None, optional): subset of stages to run. Defaults to None (all stages).
+
+    Returns:
+        dict: metadata about the run and one result per stage and size.
+    """
+    all_stages = _stages(nlp, abbreviations.exact_replacements())
+    selected = [name for name in all_stages if (stages is None or name in stages) and (nlp is not None or name not in NLP_STAGES)]
+    if importlib.util.find_spec('zstandard') is None:
+        # zstandard is optional (see 'process_pubmed.open_compressed').
+        selected = [name for name in selected if name != 'read_medline_zst']
+    exhausted: set[str] = set()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_records in sorted(sizes):
+            if all(name in exhausted for name in selected):
+                # Every selected stage has run out of time, so the larger sizes would run nothing.
+                break
+            inputs = _prepare_inputs(n_records, seed, workdir)
+
+            for name in selected:
+                if name in exhausted:
+                    continue
+
+                input_name, stage_func = all_stages[name]
+                measurement = _run_stage(stage_func, inputs[input_name], repeat, measure_memory)
+                measurement.update({'stage': name, 'n_records': n_records})
+                results.append(measurement)
+                print(f"{name:>32} {n_records:>9} records: {measurement['seconds']:.3f} s", file=sys.stderr)
+
+                if max_stage_seconds is not None and measurement['seconds'] > max_stage_seconds:
+                    exhausted.add(name)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+            'spacy_model': nlp.meta['name'] if nlp is not None else None,
+        },
+        'results': results,
+    }
+
+
+def import_times(modules: list[str] | None = None, repeat: int = 5) -> list[dict]:
+    """Measures the cold import time of the package and each of its submodules.
+
+    Every import is done in a fresh interpreter, and the fastest of 'repeat' runs is reported along
+    with the heavy third party packages (see HEAVY_MODULES) that ended up being imported.
+
+    Args:
+        modules (list[str] | None, optional): submodules to import. Defaults to None (the package itself
+            and every submodule listed in its '__all__').
+        repeat (int, optional): number of runs per import. Defaults to 5.
+
+    Returns:
+        list[dict]: one result per import.
+    """
+    package = __package__
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    if modules is None:
+        modules = [''] + list(sys.modules[package].__all__)
+
+    results = []
+    for module in modules:
+        name = f"{package}.{module}" if module else package
+        script = _IMPORT_SCRIPT.format(path=package_parent, module=name, heavy=HEAVY_MODULES)
+
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+            runs.append(json.loads(output.stdout))
+
+        results.append({
+            'module': name,
+            'seconds': min(run['seconds'] for run in runs),
+            'loaded': runs[0]['loaded'],
+        })
+        print(f"{name:>40}: {results[-1]['seconds']:.3f} s {results[-1]['loaded']}", file=sys.stderr)
+
+    return results
+
+
+def to_frame(report: dict) -> pd.DataFrame:
+    """Converts a benchmark report into a DataFrame with one row per stage and size.
+
+    Args:
+        report (dict): report as returned by 'run' or loaded from a JSON file.
+
+    Returns:
+        pd.DataFrame: the results indexed by stage and number of records.
+    """
+    df = pd.DataFrame(report['results']).drop(columns=['seconds_all'], errors='ignore')
+    return df.set_index(['stage', 'n_records']).sort_index()
+
+
+def compare(baseline: dict, candidate: dict) -> pd.DataFrame:
+    """Compares two benchmark reports.
+
+    Args:
+        baseline (dict): report of the reference run.
+        candidate (dict): report of the run to compare against the reference.
+
+    Returns:
+        pd.DataFrame: times and peak memory of both runs, with the speedup of the candidate.
+    """
+    cols = ['seconds', 'peak_memory_mb']
+    df_baseline = to_frame(baseline).reindex(columns=cols)
+    df_candidate = to_frame(candidate).reindex(columns=cols)
+
+    df = df_baseline.join(df_candidate, how='inner', lsuffix='_baseline', rsuffix='_candidate')
+    df['speedup'] = df['seconds_baseline'] / df['seconds_candidate']
+    return df
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the MEDLINE parser and the cleaning pipeline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="numbers of synthetic records")
+    parser.add_argument('--seed', type=int, default=42, help="seed for the synthetic data generator")
+    parser.add_argument('--repeat', type=int, default=1, help="number of timed runs per stage")
+    parser.add_argument('--stages', nargs='+', default=None, help="only run these stages")
+    parser.add_argument('--spacy-model', default=None, help="spaCy model for the sentence splitting and normalization stages")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory measurement")
+    parser.add_argument('--max-stage-seconds', type=float, default=600., help="stop scaling a stage once a run exceeds this")
+    parser.add_argument('--output', default=None, help="JSON file to save the results to")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'), help="compare two saved JSON reports")
+    parser.add_argument('--imports', action='store_true', help="only benchmark the import time of the package and its submodules")
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        results = import_times(repeat=args.repeat)
+        print(pd.DataFrame(results).set_index('module').to_string())
+        if args.output:
+            with open(args.output, 'w', encoding="utf8") as f:
+                json.dump({'imports': results}, f, indent=2)
+        return
+
+    if args.compare:
+        with open(args.compare[0], 'r', encoding="utf8") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], 'r', encoding="utf8") as f:
+            candidate = json.load(f)
+        print(compare(baseline, candidate).to_string())
+        return
+
+    nlp = None
+    if args.spacy_model:
+        import spacy
+        nlp = spacy.load(args.spacy_model)
+
+    report = run(
+        args.sizes,
+        seed=args.seed,
+        nlp=nlp,
+        repeat=args.repeat,
+        measure_memory=not args.no_memory,
+        max_stage_seconds=args.max_stage_seconds,
+        stages=args.stages,
+    )
+
+    print(to_frame(report).to_string())
+
+    if args.output:
+        with open(args.output, 'w', encoding="utf8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,13 @@
 import re
+from collections import Counter, OrderedDict
+
 import pandas as pd
 
+from . import abbreviation_matcher
+from .instrumentation import instrumented
+
 
+@instrumented
 def to_lowercase(cols: list[str], df_in: pd.DataFrame) -> pd.DataFrame:
     """Converts the text in the specified columns, of the provided DataFrame, to lowercase.
 
@@ -19,48 +25,32 @@ def to_lowercase(cols: list[str], df_in: pd.DataFrame) -> pd.DataFrame:
     return df_in
 
 
-def _replace_abbreviations(text: str, replacement_dict: dict[str, str]) -> str:
+def _replace_abbreviations(text: str, replacement_patterns: list[tuple[str, re.Pattern, str]]) -> str:
     """Replaces abbreviations in the provided text with their full form.
 
     Args:
         text (str): string of text to replace abbreviations in.
-        replacement_dict (dict[str, str]): dictionary of abbreviations and their full form.
+        replacement_patterns (list[tuple[str, re.Pattern, str]]): lowercase abbreviations, compiled patterns
+            and their replacements, as returned by 'abbreviation_matcher.compile_abbreviations'.
 
     Returns:
         str: the original text with abbreviations replaced.
     """
-    for key, value in replacement_dict.items():
-
-        if key.lower() == 'on':
-            # Pattern to match 'ON' in uppercase only.
-            pattern = re.compile(r'\bON\b')
-            text = pattern.sub(value, text)  # Direct replacement without group references.
+    lowered = text.lower()
+    for literal, pattern, replacement in replacement_patterns:
+        # Skip the regex entirely if the abbreviation doesn't appear anywhere in the text.
+        if literal not in lowered:
+            continue
 
-        elif key == 'al':
-            # Special case handling for 'al' in 'et al.'
-            # Pattern for 'al' that excludes 'et al.' and does not match 'al' as part of another word.
-            # Negative lookbehind to exclude 'al' in 'et al.'
-            pattern = re.compile(r'(?i)(?<!et\s)\bal\b')
-            text = pattern.sub(value, text)  # Direct replacement without group references.
-
-        else:
-            # Regular expression patterns for other cases.
-            # Note that the pattern '(?i)' is an inline flag for re.IGNORECASE - thereby making
-            # the pattern case-insensitive.
-            pattern = re.compile(
-                r'(?i)(\s)' + re.escape(key) + r'\b(?=[.,;-])|' +  # key (with leading space) before punctuation, capture leading space.
-                r'\b' + re.escape(key) + r'\b(\s)|' +              # key surrounded by whitespace, capture trailing space.
-                r'^' + re.escape(key) + r'(\s)\b|' +               # key at the beginning of the sentence (with trailing space), capture trailing space.
-                r'\(' + re.escape(key) + r'\)|'                    # key surrounded by parentheses.
-                r'\[' + re.escape(key) + r'\]'                     # key surrounded by square brackets.
-            )
-            # Replace with the full form and the captured whitespace/punctuation.
-            text = pattern.sub(r'\1' + value + r'\2', text)
+        text, n_subs = pattern.subn(replacement, text)
+        if n_subs:
+            lowered = text.lower()
 
     return text
 
 
-def replace_abbreviations(cols: list[str], df_in: pd.DataFrame, replacement_dict: dict[str, str]) -> pd.DataFrame:
+@instrumented
+def replace_abbreviations(cols: list[str], df_in: pd.DataFrame, replacement_dict: dict[str, str] | None = None) -> pd.DataFrame:
     """Replaces abbreviations in the specified columns, of the provided DataFrame, with their full form.
 
     Creates a new column by appending "_abbv" to the column name.
@@ -68,18 +58,25 @@ def replace_abbreviations(cols: list[str], df_in: pd.DataFrame, replacement_dict
     Args:
         cols (list[str]): list of columns to replace abbreviations in.
         df_in (pd.DataFrame): Pandas DataFrame containing the columns to replace abbreviations in.
-        replacement_dict (dict[str, str]): dictionary of abbreviations and their full form.
+        replacement_dict (dict[str, str] | None, optional): dictionary of abbreviations and their full form.
+            Defaults to None, in which case the patterns cached by 'abbreviation_matcher.load' are used.
 
     Returns:
         pd.DataFrame: the original DataFrame with the specified columns having their abbreviations replaced.
     """
+    # Compile the patterns once, rather than once per row.
+    if replacement_dict is None:
+        replacement_patterns = abbreviation_matcher.load()['abbreviation_patterns']
+    else:
+        replacement_patterns = abbreviation_matcher.compile_abbreviations(replacement_dict)
+
     for col in cols:
         # Concatenate a new empty column onto the existing DataFrame.
         # The new empty column should be specifically of data type pd.StringDtype().
         df_in = pd.concat([df_in, pd.DataFrame(columns=[col + "_abbv"], dtype=pd.StringDtype())], axis=1)
 
         df_in[col + '_abbv'] = df_in[col].apply(
-            lambda x: _replace_abbreviations(x, replacement_dict) if isinstance(x, str) else x
+            lambda x: _replace_abbreviations(x, replacement_patterns) if isinstance(x, str) else x
         )
 
         # Reinforce the data type of the new column as pd.StringDtype().
@@ -87,28 +84,33 @@ def replace_abbreviations(cols: list[str], df_in: pd.DataFrame, replacement_dict
     return df_in
 
 
-def _remove_duplicates(text: str, replacement_dict: dict[str, str]) -> str:
+def _remove_duplicates(text: str, duplicate_patterns: list[tuple[str, re.Pattern]]) -> str:
     """Removes consecutive duplicates of the specified phrases in the provided text.
 
     Args:
         text (str): string of text to remove duplicates from.
-        replacement_dict (dict[str, str]): dictionary of phrases to remove duplicates of.
+        duplicate_patterns (list[tuple[str, re.Pattern]]): lowercase phrases and compiled patterns matching
+            consecutive duplicates of them, as returned by 'abbreviation_matcher.compile_duplicates'.
 
     Returns:
         str: the original text with duplicates removed.
     """
-    for phrase in replacement_dict.values():
-        # Create a regex pattern to match consecutive duplicates of the phrase.
-        # This pattern uses \b for word boundaries and \s* for optional spaces.
-        pattern = re.compile(r'(' + re.escape(phrase) + r')\s*\1', re.IGNORECASE)
+    lowered = text.lower()
+    for literal, pattern in duplicate_patterns:
+        # Skip the regex entirely if the phrase doesn't appear anywhere in the text.
+        if literal not in lowered:
+            continue
 
         # Replace matched duplicates with a single instance of the phrase.
-        text = pattern.sub(r'\1', text)
+        text, n_subs = pattern.subn(r'\1', text)
+        if n_subs:
+            lowered = text.lower()
 
     return text
 
 
-def remove_duplicates(cols: list[str], df_in: pd.DataFrame, replacement_dict: dict[str, str]) -> pd.DataFrame:
+@instrumented
+def remove_duplicates(cols: list[str], df_in: pd.DataFrame, replacement_dict: dict[str, str] | None = None) -> pd.DataFrame:
     """Removes consecutive duplicates of the specified phrases in the provided DataFrame.
 
     Does not create a new column i.e. the column(s) input in the function signature are overwritten.
@@ -116,14 +118,21 @@ def remove_duplicates(cols: list[str], df_in: pd.DataFrame, replacement_dict: di
     Args:
         cols (list[str]): list of columns to remove duplicates from.
         df_in (pd.DataFrame): Pandas DataFrame containing the columns to remove duplicates from.
-        replacement_dict (dict[str, str]): dictionary of phrases to remove duplicates of.
+        replacement_dict (dict[str, str] | None, optional): dictionary of phrases to remove duplicates of.
+            Defaults to None, in which case the patterns cached by 'abbreviation_matcher.load' are used.
 
     Returns:
         pd.DataFrame: the original DataFrame with the specified columns having their duplicates removed.
     """
+    # Compile the patterns once, rather than once per row.
+    if replacement_dict is None:
+        duplicate_patterns = abbreviation_matcher.load()['duplicate_patterns']
+    else:
+        duplicate_patterns = abbreviation_matcher.compile_duplicates(replacement_dict)
+
     for col in cols:
         df_in[col] = df_in[col].apply(
-            lambda x: _remove_duplicates(x, replacement_dict) if isinstance(x, str) else x
+            lambda x: _remove_duplicates(x, duplicate_patterns) if isinstance(x, str) else x
         )
 
         # Reinforce the data type of the new column as pd.StringDtype().
@@ -131,15 +140,14 @@ def remove_duplicates(cols: list[str], df_in: pd.DataFrame, replacement_dict: di
     return df_in
 
 
-def _normalize(text: str, nlp) -> str:
-    """Normalizes the provided text.
+def _clean_for_normalization(text: str) -> str:
+    """Removes everything but letters, hyphens and apostrophes from the provided text, ahead of spaCy.
 
     Args:
-        text (str): string of text to normalize.
-        nlp (_type_): spaCy NLP object.
+        text (str): string of text to clean.
 
     Returns:
-        str: the original text normalized.
+        str: the cleaned text, with single spaces between words.
     """
     # Regarding 'p_a' ... this pattern breaks down as follows:
     #    `-`: Hyphen character.
@@ -166,33 +174,256 @@ def _normalize(text: str, nlp) -> str:
     text = text.strip()             # Trim whitespace.
     text = re.sub(p_b, ' ', text)   # Replace multiple spaces (2nd pass).
 
+    return text
+
+
+class LemmaMemo:
+    """Bounded memo table from the surface form of a word to its lemma, for the fast mode of 'normalize'.
+
+    The table is filled lazily: a sentence containing a word that isn't in the table yet is run
+    through the full spaCy pipeline, and the lemma of each of its words is recorded the first time
+    that word is seen. Once the table is warm, sentences only go through the tokenizer. The least
+    recently used words are evicted once the table holds 'max_size' words.
+
+    'max_size' should cover the vocabulary of the text, i.e. the number of distinct word forms
+    (roughly 'df[col].str.split().explode().nunique()'). If it doesn't, words keep being evicted
+    and looked up again, most sentences need the full pipeline ('misses' grows about as fast as the
+    number of sentences) and the fast mode ends up slower than the full pipeline. Each word takes
+    roughly 200 bytes, so the default of 100_000 words is about 20 MB.
+
+    The lemma of a word can depend on its context (its part of speech), so the fast mode can
+    disagree with the full pipeline. Use 'normalize_agreement' to measure how often it does.
+
+    Args:
+        max_size (int, optional): maximum number of words in the table. Defaults to 100_000.
+    """
+
+    def __init__(self, max_size: int = 100_000) -> None:
+        self.max_size = max_size
+        self.lemmas: OrderedDict[str, str] = OrderedDict()
+
+        # Number of sentences answered from the table, and number that needed the full pipeline.
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.lemmas)
+
+    def add(self, form: str, lemma: str) -> None:
+        """Records the lemma of a word, evicting the least recently used word if the table is full."""
+        self.lemmas[form] = lemma
+        self.lemmas.move_to_end(form)
+        if len(self.lemmas) > self.max_size:
+            self.lemmas.popitem(last=False)
+
+
+def _lemmas(text: str, nlp) -> list[str]:
+    """Lemmatizes the provided (cleaned) text with the full spaCy pipeline, dropping stopwords and punctuation.
+
+    Args:
+        text (str): string of text to lemmatize.
+        nlp (_type_): spaCy NLP object.
+
+    Returns:
+        list[str]: the lemmas, in order.
+    """
     # spaCy processing for stopword removal and lemmatization.
     doc = nlp(text)
-    lemmatized_sentence = ' '.join([token.lemma_ for token in doc if not token.is_stop and not token.is_punct])
+    return [token.lemma_ for token in doc if not token.is_stop and not token.is_punct]
+
+
+def _record_lemmas(doc, memo: LemmaMemo) -> list[str]:
+    """Records the lemmas of a sentence processed by the full pipeline in the memo table.
+
+    Args:
+        doc (_type_): the processed spaCy Doc.
+        memo (LemmaMemo): the memo table, updated in place.
+
+    Returns:
+        list[str]: the lemmas, in order.
+    """
+    kept = [token for token in doc if not token.is_stop and not token.is_punct]
+    for token in kept:
+        if token.text in memo.lemmas:
+            memo.lemmas.move_to_end(token.text)
+        else:
+            memo.add(token.text, token.lemma_)
+    return [token.lemma_ for token in kept]
+
+
+def _memoized_lemmas(texts: list[str], nlp, memo: LemmaMemo, batch_size: int = 256) -> list[list[str]]:
+    """Lemmatizes the provided (cleaned) texts from the memo table, falling back to the full pipeline.
+
+    'is_stop' and 'is_punct' are attributes of the word itself (the spaCy lexeme), not of its context,
+    so the tokenizer alone gives the same answer for them as the full pipeline.
+
+    The texts are looked up 'batch_size' at a time. Those containing a word that isn't in the table
+    yet are then run through the full pipeline together with 'nlp.pipe', reusing their tokenization,
+    so the words are lemmatized in context, and the new words are recorded. Texts whose new words
+    all occur in an earlier text of the batch wait for those to be recorded instead.
+
+    Args:
+        texts (list[str]): strings of text to lemmatize.
+        nlp (_type_): spaCy NLP object.
+        memo (LemmaMemo): the memo table, updated in place.
+        batch_size (int, optional): number of texts looked up, and passed to 'nlp.pipe', at a time. Defaults to 256.
+
+    Returns:
+        list[list[str]]: the lemmas of each text, in order.
+    """
+    lemmas = memo.lemmas
+    results: list[list[str]] = []
+
+    def lookup(words: list[str]) -> list[str]:
+        memo.hits += 1
+        for word in words:
+            lemmas.move_to_end(word)
+        return [lemmas[word] for word in words]
+
+    for start in range(0, len(texts), batch_size):
+        missed: list[tuple[int, object]] = []
+        waiting: list[tuple[int, object, list[str]]] = []
+        new_words: set[str] = set()
+
+        for doc in nlp.tokenizer.pipe(texts[start:start + batch_size]):
+            words = [token.text for token in doc if not token.is_stop and not token.is_punct]
+            unseen = {word for word in words if word not in lemmas}
+            if not unseen:
+                results.append(lookup(words))
+                continue
+            if unseen <= new_words:
+                waiting.append((len(results), doc, words))
+            else:
+                missed.append((len(results), doc))
+                new_words |= unseen
+            results.append([])
+
+        for (position, _), doc in zip(missed, nlp.pipe([doc for _, doc in missed], batch_size=batch_size)):
+            memo.misses += 1
+            results[position] = _record_lemmas(doc, memo)
+
+        for position, doc, words in waiting:
+            if all(word in lemmas for word in words):
+                results[position] = lookup(words)
+            else:
+                # Evicted in the meantime, because the table is smaller than the vocabulary of the batch.
+                memo.misses += 1
+                results[position] = _record_lemmas(nlp(doc), memo)
+
+    return results
+
+
+def _normalize(text: str, nlp) -> str:
+    """Normalizes the provided text.
+
+    Args:
+        text (str): string of text to normalize.
+        nlp (_type_): spaCy NLP object.
+
+    Returns:
+        str: the original text normalized.
+    """
+    text = _clean_for_normalization(text)
+
+    lemmatized_sentence = ' '.join(_lemmas(text, nlp))
 
     return lemmatized_sentence
 
 
-def normalize(cols: list[str], df_in: pd.DataFrame, nlp) -> pd.DataFrame:
+@instrumented
+def normalize(cols: list[str], df_in: pd.DataFrame, nlp, memo: LemmaMemo | None = None) -> pd.DataFrame:
     """Normalizes the text in the specified columns, of the provided DataFrame.
 
     Creates a new column by replacing "_lowercase_abbv" with "_normalized" in the column name.
 
+    Passing a 'LemmaMemo' switches to the fast mode: sentences are only tokenized, and the lemmas
+    come from the memo table, which is filled from the full pipeline (in batches, with 'nlp.pipe')
+    the first time each word is seen. Reuse the same 'LemmaMemo' across calls (e.g. batches) to keep
+    it warm, and see 'LemmaMemo' for how large to make it.
+
     Args:
         cols (list[str]): list of columns to normalize.
         df_in (pd.DataFrame): Pandas DataFrame containing the columns to normalize.
         nlp (_type_): spaCy NLP object.
+        memo (LemmaMemo | None, optional): memo table for the fast mode. Defaults to None (full pipeline).
 
     Returns:
         pd.DataFrame: the original DataFrame with the specified columns normalized.
     """
     for col in cols:
-        df_in[col.replace('_lowercase_abbv', '_normalized')] = df_in[col].apply(
-            lambda x: _normalize(x, nlp) if isinstance(x, str) else x
-        )
+        if memo is None:
+            normalized = df_in[col].apply(lambda x: _normalize(x, nlp) if isinstance(x, str) else x)
+        else:
+            normalized = df_in[col].copy()
+            is_text = normalized.map(lambda x: isinstance(x, str)).to_numpy(dtype=bool)
+            texts = [_clean_for_normalization(text) for text in normalized[is_text]]
+            normalized[is_text] = [' '.join(lemmas) for lemmas in _memoized_lemmas(texts, nlp, memo)]
+        df_in[col.replace('_lowercase_abbv', '_normalized')] = normalized
     return df_in
 
 
+def normalize_agreement(cols: list[str], df_in: pd.DataFrame, nlp, memo: LemmaMemo | None = None,
+                        sample: int | None = None, seed: int = 42) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Compares the fast mode of 'normalize' against the full pipeline, word by word.
+
+    Both modes tokenize the same way and drop the same words, so their outputs line up word for word
+    and only the lemmas can differ.
+
+    Args:
+        cols (list[str]): list of columns to compare on.
+        df_in (pd.DataFrame): Pandas DataFrame containing the columns.
+        nlp (_type_): spaCy NLP object.
+        memo (LemmaMemo | None, optional): memo table for the fast mode. Defaults to None (a new, cold, table).
+        sample (int | None, optional): number of rows to compare, drawn at random. Defaults to None (all rows).
+        seed (int, optional): seed for drawing the sample. Defaults to 42.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: a summary per column (rows and words compared, the fraction
+        that agree, and the number of sentences that needed the full pipeline in the fast mode); and
+        every disagreement (column, word, fast and full lemma) with the number of times it occurred.
+    """
+    if memo is None:
+        memo = LemmaMemo()
+    if sample is not None and sample < len(df_in):
+        df_in = df_in.sample(n=sample, random_state=seed)
+
+    summary = []
+    disagreements: Counter[tuple[str, str, str, str]] = Counter()
+    for col in cols:
+        misses_before = memo.misses
+        rows = rows_agreeing = words = words_agreeing = 0
+
+        texts = [_clean_for_normalization(text) for text in df_in[col] if isinstance(text, str)]
+        for text, fast in zip(texts, _memoized_lemmas(texts, nlp, memo)):
+            full = _lemmas(text, nlp)
+            forms = [token.text for token in nlp.tokenizer(text) if not token.is_stop and not token.is_punct]
+
+            rows += 1
+            rows_agreeing += fast == full
+            words += len(full)
+            for form, fast_lemma, full_lemma in zip(forms, fast, full):
+                if fast_lemma == full_lemma:
+                    words_agreeing += 1
+                else:
+                    disagreements[(col, form, fast_lemma, full_lemma)] += 1
+
+        summary.append({
+            'column': col,
+            'rows': rows,
+            'row_agreement': rows_agreeing / rows if rows else None,
+            'words': words,
+            'word_agreement': words_agreeing / words if words else None,
+            'rows_needing_full_pipeline': memo.misses - misses_before,
+            'memo_size': len(memo),
+        })
+
+    df_disagreements = pd.DataFrame(
+        [(*key, count) for key, count in disagreements.most_common()],
+        columns=['column', 'word', 'lemma_fast', 'lemma_full', 'count'],
+    )
+    return pd.DataFrame(summary).set_index('column'), df_disagreements
+
+
 def _correct_sentence_splitting(sentences: list[str]) -> list[str]:
     """Corrects the splitting of sentences that have been split incorrectly.
 
@@ -252,6 +483,7 @@ def _split_into_sentences(text: str, nlp) -> list[str]:
     return corrected_sentences
 
 
+@instrumented
 def split_into_sentences(cols: list[str], df_in: pd.DataFrame, nlp) -> pd.DataFrame:
     """Splits the text in the specified columns, of the provided DataFrame, into sentences.
 
@@ -297,6 +529,7 @@ def _remove_uppercase_colon_phrases(text: str) -> str:
     return modified_text
 
 
+@instrumented
 def remove_uppercase_colon_phrases(cols: list[str], df_in: pd.DataFrame) -> pd.DataFrame:
     """Removes uppercase phrases between a period and a colon, or at the start of the string before a colon.
 
@@ -343,6 +576,7 @@ def _whitespace(text: str) -> str:
     return text
 
 
+@instrumented
 def whitespace(cols: list[str], df_in: pd.DataFrame) -> pd.DataFrame:
     """Normalizes the whitespace in the specified column(s), of the provided DataFrame.
 
@@ -360,3 +594,29 @@ def whitespace(cols: list[str], df_in: pd.DataFrame) -> pd.DataFrame:
             lambda x: _whitespace(x) if isinstance(x, str) else x
         )
     return df_in
+
+
+@instrumented
+def unify_terms(cols: list[str], df_in: pd.DataFrame, replacement_mapping: dict[str, str] | None = None) -> pd.DataFrame:
+    """Unifies the spelling variants of domain specific terms (e.g. "unet" and "U-net" become "U-Net").
+
+    Does not create a new column i.e. the column(s) input in the function signature are overwritten.
+
+    Args:
+        cols (list[str]): list of columns to unify terms in.
+        df_in (pd.DataFrame): Pandas DataFrame containing the columns to unify terms in.
+        replacement_mapping (dict[str, str] | None, optional): dictionary of term variants and their unified form.
+            Defaults to None, in which case the patterns cached by 'abbreviation_matcher.load' are used.
+
+    Returns:
+        pd.DataFrame: the original DataFrame with the specified columns having their terms unified.
+    """
+    if replacement_mapping is None:
+        domain_patterns = abbreviation_matcher.load()['domain_patterns']
+    else:
+        domain_patterns = abbreviation_matcher.compile_domain_terms(replacement_mapping)
+
+    for col in cols:
+        for _, pattern, unified_term in domain_patterns:
+            df_in[col] = df_in[col].str.replace(pattern, unified_term, regex=True)
+    return df_in
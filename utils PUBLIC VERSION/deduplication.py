@@ -0,0 +1,252 @@
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrumented
+
+
+# Constants for the universal hash family (a * x + b) mod p used to build the MinHash permutations.
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _shingle_hashes(text: str, shingle_size: int) -> np.ndarray:
+    """Hashes the word shingles (overlapping runs of 'shingle_size' words) of the provided text.
+
+    Args:
+        text (str): string of text to shingle.
+        shingle_size (int): number of words per shingle.
+
+    Returns:
+        np.ndarray: the unique 32-bit shingle hashes, as uint64.
+    """
+    words = re.findall(r'\w+', text.lower())
+    if len(words) <= shingle_size:
+        shingles = {' '.join(words)}
+    else:
+        shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+
+    # crc32, unlike the built-in 'hash', is stable between Python sessions.
+    return np.fromiter((zlib.crc32(shingle.encode('utf8')) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def _permutations(num_perm: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Draws the parameters of the 'num_perm' hash functions used as MinHash permutations.
+
+    Args:
+        num_perm (int): number of permutations.
+        seed (int): seed for the random number generator.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the 'a' and 'b' parameters of each hash function.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _minhash(shingle_hashes: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Computes the MinHash signature of one set of shingle hashes.
+
+    Args:
+        shingle_hashes (np.ndarray): the shingle hashes, as returned by '_shingle_hashes'.
+        a (np.ndarray): 'a' parameters of the permutations.
+        b (np.ndarray): 'b' parameters of the permutations.
+
+    Returns:
+        np.ndarray: the signature, one uint32 per permutation.
+    """
+    # Wrap-around of the uint64 multiplication is intended, it only perturbs the hash family.
+    with np.errstate(over='ignore'):
+        permuted = np.bitwise_and((shingle_hashes[:, np.newaxis] * a + b) % _MERSENNE_PRIME, _MAX_HASH)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    """Finds the root of 'i' in a union-find forest, compressing the path on the way."""
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+def _near_duplicate_groups(signatures: np.ndarray, bands: int, threshold: float) -> np.ndarray:
+    """Groups documents whose MinHash signatures collide in at least one LSH band.
+
+    Candidate pairs from the banding are only merged if their estimated Jaccard similarity (the
+    fraction of equal signature values) reaches 'threshold'.
+
+    Args:
+        signatures (np.ndarray): MinHash signatures, one row per document.
+        bands (int): number of LSH bands. Must divide the number of permutations.
+        threshold (float): minimum estimated Jaccard similarity of a near-duplicate.
+
+    Returns:
+        np.ndarray: for each document, the position of the first document in its group.
+    """
+    n_docs, num_perm = signatures.shape
+    rows = num_perm // bands
+    parent = np.arange(n_docs)
+
+    for band in range(bands):
+        # View each row of the band as a single opaque value so identical bands can be found with 'np.unique'.
+        band_values = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        band_keys = band_values.view(np.dtype((np.void, band_values.dtype.itemsize * rows))).ravel()
+        _, first, bucket = np.unique(band_keys, return_index=True, return_inverse=True)
+
+        # Pair every document with the first document in its bucket.
+        candidates = np.flatnonzero(first[bucket] != np.arange(n_docs))
+        if len(candidates) == 0:
+            continue
+        representatives = first[bucket[candidates]]
+
+        similarity = (signatures[candidates] == signatures[representatives]).mean(axis=1)
+        for i, j in zip(candidates[similarity >= threshold], representatives[similarity >= threshold]):
+            root_i, root_j = _find(parent, i), _find(parent, j)
+            if root_i != root_j:
+                # Keep the earliest document as the root, so it becomes the canonical record.
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    return np.array([_find(parent, i) for i in range(n_docs)], dtype=np.int64)
+
+
+@instrumented
+def mark_near_duplicates(cols: list[str], df_in: pd.DataFrame, threshold: float = 0.8, num_perm: int = 128,
+                         bands: int = 32, shingle_size: int = 5, seed: int = 42) -> pd.DataFrame:
+    """Finds near-duplicate texts (e.g. errata and republished abstracts) in the specified columns.
+
+    Each text is reduced to a MinHash signature of its word shingles, and locality sensitive hashing
+    (LSH) on bands of the signatures finds the candidate pairs, so the run time grows roughly linearly
+    with the number of rows. Near-duplicates are grouped and the first row of each group, in
+    DataFrame order, is its canonical record.
+
+    Creates a new column by appending "_canonical" to the column name. It holds the index label of
+    the canonical record of each row (a row's own label if it has no near-duplicates or no words).
+    The index of 'df_in' must be unique.
+
+    Args:
+        cols (list[str]): list of columns to find near-duplicates in.
+        df_in (pd.DataFrame): Pandas DataFrame containing the columns to find near-duplicates in.
+        threshold (float, optional): minimum estimated Jaccard similarity of two near-duplicates. Defaults to 0.8.
+        num_perm (int, optional): number of MinHash permutations. Defaults to 128.
+        bands (int, optional): number of LSH bands. Must divide 'num_perm'. Defaults to 32.
+        shingle_size (int, optional): number of words per shingle. Defaults to 5.
+        seed (int, optional): seed for the MinHash permutations. Defaults to 42.
+
+    Returns:
+        pd.DataFrame: the original DataFrame with a canonical record column for each specified column.
+    """
+    if num_perm % bands != 0:
+        raise ValueError(f"'bands' ({bands}) must divide 'num_perm' ({num_perm}).")
+    if not df_in.index.is_unique:
+        raise ValueError("The index of 'df_in' must be unique.")
+
+    a, b = _permutations(num_perm, seed)
+
+    for col in cols:
+        # Texts without a single word (e.g. '...') would all hash to the same empty shingle.
+        has_text = df_in[col].map(lambda x: isinstance(x, str) and re.search(r'\w', x) is not None).to_numpy(dtype=bool)
+        positions = np.flatnonzero(has_text)
+
+        signatures = np.empty((len(positions), num_perm), dtype=np.uint32)
+        for row, text in enumerate(df_in[col].iloc[positions]):
+            signatures[row] = _minhash(_shingle_hashes(text, shingle_size), a, b)
+
+        canonical_positions = np.arange(len(df_in))
+        canonical_positions[positions] = positions[_near_duplicate_groups(signatures, bands, threshold)]
+
+        df_in[col + '_canonical'] = df_in.index[canonical_positions]
+    return df_in
+
+
+def canonical_records(col: str, df_in: pd.DataFrame) -> pd.DataFrame:
+    """Returns only the canonical records i.e. drops the near-duplicates found by 'mark_near_duplicates'.
+
+    Args:
+        col (str): the column that was passed to 'mark_near_duplicates'.
+        df_in (pd.DataFrame): Pandas DataFrame containing the "_canonical" column.
+
+    Returns:
+        pd.DataFrame: the rows that are their own canonical record.
+    """
+    return df_in[df_in[col + '_canonical'] == df_in.index]
+
+
+def map_to_duplicates(df_results: pd.DataFrame, canonical: pd.Series) -> pd.DataFrame:
+    """Copies results computed for the canonical records back onto their near-duplicates.
+
+    'df_results' is indexed by the index label of the canonical record it belongs to. It can have
+    several rows per record, e.g. one per sentence with its topic, since 'DataFrame.explode' keeps
+    the index of the exploded row.
+
+    Args:
+        df_results (pd.DataFrame): results for the canonical records, indexed by record label.
+        canonical (pd.Series): the "_canonical" column created by 'mark_near_duplicates', covering
+            every record (canonical or not).
+
+    Returns:
+        pd.DataFrame: the results for every record, indexed by record label.
+    """
+    pairs = pd.DataFrame({'_canonical': canonical.to_numpy(), '_position': np.arange(len(canonical))}, index=canonical.index)
+    df_out = pairs.join(df_results, on='_canonical', how='inner')
+
+    # Keep the records in the order of 'canonical', and each record's rows in the order of 'df_results'.
+    df_out = df_out.sort_values('_position', kind='stable')
+    return df_out.drop(columns=['_canonical', '_position'])
+
+
+@instrumented
+def unique_sentences(col: str, df_in: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Keeps one representative of every distinct sentence, with the number of times it occurs.
+
+    Meant to run after 'cleaning_pipeline.split_into_sentences' and the explode step, so that
+    boilerplate repeated across the corpus (copyright lines, "This is an open access article...")
+    goes through the downstream stages, embedding and clustering only once. Sentences are hashed
+    by 'pd.factorize' and compared exactly.
+
+    Creates a new column in 'df_in' by appending "_uid" to the column name. It holds the position of
+    the row's sentence in the returned unique DataFrame (-1 if the row has no sentence).
+
+    Args:
+        col (str): the column of sentences to deduplicate.
+        df_in (pd.DataFrame): Pandas DataFrame containing the column, one row per sentence.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: the unique sentences, indexed by their id, with their
+        multiplicity in a column named by appending "_count" to the column name; and the original
+        DataFrame with the "_uid" column.
+    """
+    codes, uniques = pd.factorize(df_in[col], use_na_sentinel=True)
+
+    df_unique = pd.DataFrame({col: uniques}, index=pd.RangeIndex(len(uniques), name=col + '_uid'))
+    df_unique = df_unique.astype({col: df_in[col].dtype})
+    df_unique[col + '_count'] = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    df_in[col + '_uid'] = codes
+    return df_unique, df_in
+
+
+def expand_unique(df_unique: pd.DataFrame, uids: pd.Series) -> pd.DataFrame:
+    """Expands results computed for the unique sentences back to every row they came from.
+
+    Rows whose sentence was dropped from 'df_unique' (e.g. blank sentences removed after cleaning),
+    or that had no sentence, are dropped.
+
+    Args:
+        df_unique (pd.DataFrame): results for the unique sentences, indexed by sentence id.
+        uids (pd.Series): the "_uid" column created by 'unique_sentences'.
+
+    Returns:
+        pd.DataFrame: the results for every row, indexed like 'uids'.
+    """
+    positions = df_unique.index.get_indexer(uids)
+    keep = positions >= 0
+
+    df_out = df_unique.iloc[positions[keep]]
+    df_out.index = uids.index[keep]
+    return df_out
@@ -1,12 +1,15 @@
-import matplotlib.font_manager
-import matplotlib.pyplot as plt  # noqa: F401
 from tempfile import NamedTemporaryFile
-from fontTools import ttLib
 import re
-import requests
 
 
 def get_google_font(fontname):
+    # Imported here, rather than at module level, so that importing the 'utils' package doesn't
+    # pull in matplotlib, fontTools and requests unless a font is actually fetched.
+    import matplotlib.font_manager
+    import matplotlib.pyplot as plt  # noqa: F401
+    from fontTools import ttLib
+    import requests
+
     api_fontname = fontname.replace(' ', '+')
 
     api_response = requests.get(
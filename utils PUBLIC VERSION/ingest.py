@@ -0,0 +1,222 @@
+"""Streaming end-to-end ingest: MEDLINE (or PubMed XML) file in, cleaned sentences out as Parquet.
+
+Runs the same 'process_pubmed' and 'cleaning_pipeline' stages as the notebook, from reading the
+search results to unifying the domain specific terms, as a chain of generators over batches of
+'--batch-size' records. Each batch is written out as soon as it is cleaned, so memory use depends on
+the batch size, not on the size of the input. Run from the directory containing the 'utils' package:
+
+    python -m utils.ingest "Search Results/pubmed-machinelea-set.txt.gz" sentences.parquet --batch-size 1000
+
+The output has one row per sentence, with the 'paper' column numbering the papers (with an abstract
+or not) in file order, like the index of 'df_orig' in the notebook:
+
+    df_orig = pd.read_parquet('sentences.parquet').set_index('paper')
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import cleaning_pipeline, instrumentation, process_pubmed, pubmed_field_definitions, pubmed_xml
+
+
+# Columns written for every sentence, besides 'paper' and the extra fields asked for with '--keep'.
+OUTPUT_COLUMNS: list[str] = ['Abstract', 'Abstract_split', 'Abstract_split_abbv']
+
+DEFAULT_KEEP: list[str] = ['PubMed Unique Identifier']
+
+# 'get_data' only stores the last line of a record once it reaches the blank line after it, and a
+# list can't end on a blank line. So every batch ends with a blank line followed by the start of
+# an empty record, which 'get_data' finishes without adding a row.
+_BATCH_END: list = [np.nan, 'PMID- ']
+
+
+def iter_entry_batches(filename: str, batch_size: int) -> Iterator[list[str]]:
+    """Groups the lines of a MEDLINE file into batches of 'batch_size' records, ready for 'get_data'.
+
+    Args:
+        filename (str): path of the MEDLINE file, optionally compressed (see 'process_pubmed.open_compressed').
+        batch_size (int): number of records per batch.
+
+    Yields:
+        list[str]: the lines of each batch, with NaN for the blank lines between records.
+    """
+    batch: list = []
+    n_records = 0
+    record_open = False
+
+    for line in process_pubmed.iter_medline_lines(filename):
+        if isinstance(line, str):
+            batch.append(line)
+            record_open = True
+            continue
+
+        # A blank line ends a record. Repeated blank lines (and those at the start of the file) are skipped.
+        if not record_open:
+            continue
+        record_open = False
+        n_records += 1
+
+        if n_records == batch_size:
+            yield batch + _BATCH_END
+            batch, n_records = [], 0
+        else:
+            batch.append(line)
+
+    if record_open:
+        yield batch + _BATCH_END
+    elif batch:
+        # The file ended on a blank line, which is already in the batch.
+        yield batch[:-1] + _BATCH_END
+
+
+def iter_record_batches(filename: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """Parses a MEDLINE or PubMed XML file into DataFrames of at most 'batch_size' records.
+
+    Files whose name contains ".xml" are read with 'pubmed_xml', the others with 'process_pubmed.get_data'.
+    The records are indexed by their position in the file.
+
+    Args:
+        filename (str): path of the input file, optionally compressed.
+        batch_size (int): number of records per batch.
+
+    Yields:
+        pd.DataFrame: one row per record and one column per field in 'pubmed_field_definitions.definitions()'.
+    """
+    field_dict: dict[str, str] = pubmed_field_definitions.definitions()
+
+    if '.xml' in os.path.basename(filename).lower():
+        batches = pubmed_xml.iter_batches(filename, batch_size)
+    else:
+        batches = (
+            process_pubmed.get_data(lines, field_dict, pd.DataFrame(columns=list(field_dict.keys()), dtype=pd.StringDtype()))
+            for lines in iter_entry_batches(filename, batch_size)
+        )
+
+    n_records = 0
+    for df_batch in batches:
+        df_batch = df_batch.reindex(columns=list(field_dict.keys())).astype(pd.StringDtype())
+        df_batch.index = pd.RangeIndex(n_records, n_records + len(df_batch), name='paper')
+        n_records += len(df_batch)
+        yield df_batch
+
+
+def clean_batch(df_in: pd.DataFrame, nlp, keep: list[str] | None = None) -> pd.DataFrame:
+    """Runs the notebook's cleaning stages on one batch of records.
+
+    Args:
+        df_in (pd.DataFrame): records as yielded by 'iter_record_batches'.
+        nlp (_type_): spaCy NLP object.
+        keep (list[str] | None, optional): fields to keep alongside the sentences. Defaults to None.
+
+    Returns:
+        pd.DataFrame: one row per sentence, indexed by paper.
+    """
+    keep = keep or []
+
+    # Some papers don't have an abstract.
+    df_orig = df_in.dropna(subset=['Abstract']).copy()
+
+    df_orig = cleaning_pipeline.split_into_sentences(['Abstract'], df_orig, nlp)
+    df_orig = df_orig.explode('Abstract_split')[keep + ['Abstract', 'Abstract_split']].copy(deep=True)
+
+    df_orig = cleaning_pipeline.replace_abbreviations(['Abstract_split'], df_orig)
+    df_orig = cleaning_pipeline.remove_duplicates(['Abstract_split_abbv'], df_orig)
+    df_orig = cleaning_pipeline.remove_uppercase_colon_phrases(['Abstract_split_abbv'], df_orig)
+
+    # Drop the sentences that are now empty strings.
+    df_orig = df_orig[df_orig['Abstract_split_abbv'] != '']
+
+    df_orig = cleaning_pipeline.whitespace(['Abstract_split_abbv'], df_orig)
+    df_orig = cleaning_pipeline.unify_terms(['Abstract_split_abbv'], df_orig)
+    return df_orig
+
+
+def iter_sentence_batches(record_batches: Iterator[pd.DataFrame], nlp, keep: list[str] | None = None) -> Iterator[pd.DataFrame]:
+    """Cleans each batch of records as it arrives (see 'clean_batch')."""
+    for df_batch in record_batches:
+        yield clean_batch(df_batch, nlp, keep)
+
+
+def write_parquet(sentence_batches: Iterator[pd.DataFrame], output: str, keep: list[str] | None = None) -> int:
+    """Writes each batch of sentences to a Parquet file as soon as it is available.
+
+    Every batch is written with the same schema, all strings apart from the 'paper' number, whatever
+    types pandas inferred for it (e.g. for a batch with no sentences at all).
+
+    Args:
+        sentence_batches (Iterator[pd.DataFrame]): batches as yielded by 'iter_sentence_batches'.
+        output (str): path of the Parquet file.
+        keep (list[str] | None, optional): the fields kept by 'clean_batch'. Defaults to None.
+
+    Returns:
+        int: number of sentences written.
+    """
+    columns = (keep or []) + OUTPUT_COLUMNS
+    schema = pa.schema([pa.field('paper', pa.int64())] + [pa.field(col, pa.string()) for col in columns])
+
+    n_rows = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        for df_batch in sentence_batches:
+            df_batch = df_batch.rename_axis('paper').reset_index()[['paper'] + columns].astype({col: object for col in columns})
+            writer.write_table(pa.Table.from_pandas(df_batch, schema=schema, preserve_index=False))
+            n_rows += len(df_batch)
+    return n_rows
+
+
+def run(filename: str, output: str, nlp, batch_size: int = 1000, keep: list[str] | None = None) -> int:
+    """Runs the whole ingest, one batch at a time.
+
+    Args:
+        filename (str): path of the input file (MEDLINE or PubMed XML), optionally compressed.
+        output (str): path of the Parquet file.
+        nlp (_type_): spaCy NLP object.
+        batch_size (int, optional): number of records per batch. Defaults to 1000.
+        keep (list[str] | None, optional): fields to keep alongside the sentences. Defaults to None.
+
+    Returns:
+        int: number of sentences written.
+    """
+    start = time.perf_counter()
+
+    def progress(record_batches: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        n_records = 0
+        for df_batch in record_batches:
+            n_records += len(df_batch)
+            print(f"{n_records:>10} records, {time.perf_counter() - start:.1f} s", file=sys.stderr)
+            yield df_batch
+
+    record_batches = progress(iter_record_batches(filename, batch_size))
+    return write_parquet(iter_sentence_batches(record_batches, nlp, keep), output, keep)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Parse and clean PubMed search results in batches, writing the sentences to Parquet.")
+    parser.add_argument('input', help="MEDLINE (.txt) or PubMed XML (.xml) file, optionally compressed")
+    parser.add_argument('output', help="Parquet file to write the cleaned sentences to")
+    parser.add_argument('--batch-size', type=int, default=1000, help="number of records per batch")
+    parser.add_argument('--spacy-model', default='en_core_web_trf', help="spaCy model used to split the abstracts into sentences")
+    parser.add_argument('--keep', nargs='*', default=DEFAULT_KEEP, help="fields to keep alongside the sentences")
+    parser.add_argument('--metrics', default=None, help="JSON lines file to write the per stage timings to")
+    args = parser.parse_args(argv)
+
+    import spacy
+    nlp = spacy.load(args.spacy_model)
+
+    if args.metrics:
+        with instrumentation.instrument(instrumentation.JsonLinesSink(args.metrics)):
+            n_rows = run(args.input, args.output, nlp, args.batch_size, args.keep)
+    else:
+        n_rows = run(args.input, args.output, nlp, args.batch_size, args.keep)
+
+    print(f"Wrote {n_rows} sentences to {args.output}.", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
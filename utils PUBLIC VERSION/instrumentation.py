@@ -0,0 +1,205 @@
+import functools
+import inspect
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+import pandas as pd
+
+
+@dataclass
+class StageRecord:
+    """Measurements for one call of an instrumented stage."""
+    stage: str
+    wall_seconds: float
+    cpu_seconds: float
+    rows_in: int | None
+    rows_out: int | None
+    chars_in: int | None
+    peak_memory_delta_bytes: int | None
+    timestamp: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+
+class MemorySink:
+    """Collects the stage records in memory e.g. for inspection in a notebook."""
+
+    def __init__(self) -> None:
+        self.records: list[StageRecord] = []
+
+    def __call__(self, record: StageRecord) -> None:
+        self.records.append(record)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Returns the collected records as a DataFrame, one row per stage call."""
+        return pd.DataFrame([asdict(record) for record in self.records])
+
+
+class JsonLinesSink:
+    """Appends each stage record as one JSON object per line to a file."""
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+    def __call__(self, record: StageRecord) -> None:
+        with open(self.filename, 'a', encoding="utf8") as f:
+            f.write(json.dumps(asdict(record)) + '\n')
+
+
+class LoggingSink:
+    """Writes each stage record to a logger."""
+
+    def __init__(self, logger: logging.Logger | None = None, level: int = logging.INFO) -> None:
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.level = level
+
+    def __call__(self, record: StageRecord) -> None:
+        self.logger.log(
+            self.level,
+            "%s: %.3f s wall, %.3f s cpu, rows %s -> %s, %s chars, peak memory delta %s bytes",
+            record.stage, record.wall_seconds, record.cpu_seconds, record.rows_in, record.rows_out,
+            record.chars_in, record.peak_memory_delta_bytes,
+        )
+
+
+# Module level state. Instrumentation is off until 'enable' is called, in which case the wrapped
+# stages only pay for a single attribute lookup and comparison.
+_sink: Callable[[StageRecord], None] | None = None
+_trace_memory: bool = False
+
+
+def enable(sink: Callable[[StageRecord], None], trace_memory: bool = False) -> None:
+    """Switches on instrumentation of the pipeline stages.
+
+    Args:
+        sink (Callable[[StageRecord], None]): callable receiving one 'StageRecord' per stage call e.g.
+            'MemorySink()', 'JsonLinesSink("stages.jsonl")' or 'LoggingSink()'.
+        trace_memory (bool, optional): whether to measure the peak memory delta of each stage with
+            tracemalloc. This slows the stages down noticeably. Defaults to False.
+    """
+    global _sink, _trace_memory
+    _sink = sink
+    _trace_memory = trace_memory
+
+
+def disable() -> None:
+    """Switches off instrumentation of the pipeline stages."""
+    global _sink, _trace_memory
+    _sink = None
+    _trace_memory = False
+
+
+@contextmanager
+def instrument(sink: Callable[[StageRecord], None], trace_memory: bool = False) -> Iterator[Callable[[StageRecord], None]]:
+    """Context manager switching on instrumentation for the duration of a block.
+
+    Args:
+        sink (Callable[[StageRecord], None]): callable receiving one 'StageRecord' per stage call.
+        trace_memory (bool, optional): whether to measure the peak memory delta of each stage. Defaults to False.
+
+    Yields:
+        Iterator[Callable[[StageRecord], None]]: the sink.
+    """
+    previous = (_sink, _trace_memory)
+    enable(sink, trace_memory)
+    try:
+        yield sink
+    finally:
+        if previous[0] is not None:
+            enable(*previous)
+        else:
+            disable()
+
+
+def _count_chars(data, cols: list[str] | None) -> int | None:
+    """Counts the characters in the stage input.
+
+    Args:
+        data (_type_): the stage input, either a DataFrame or a list of lines.
+        cols (list[str] | None): the columns the stage works on, when the input is a DataFrame.
+
+    Returns:
+        int | None: number of characters, or None if the input isn't recognised.
+    """
+    if isinstance(data, pd.DataFrame):
+        if not cols:
+            return None
+        # Summed in Python, since 'Series.sum' fails on an empty column of 'pd.StringDtype()'.
+        return sum(len(x) for col in cols if col in data for x in data[col] if isinstance(x, str))
+    if isinstance(data, list):
+        return sum(len(x) for x in data if isinstance(x, str))
+    return None
+
+
+def instrumented(func: Callable) -> Callable:
+    """Decorator recording timing, row counts, characters processed and memory for a pipeline stage.
+
+    The stage input is the first argument named 'df_in' or 'full_list', and the columns processed
+    are taken from an argument named 'cols' (or 'col', for a single column) if there is one. The
+    stage output is the return value, or its first element if the stage returns a tuple.
+
+    Args:
+        func (Callable): the stage function.
+
+    Returns:
+        Callable: the wrapped stage function.
+    """
+    signature = inspect.signature(func)
+    stage_name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        sink = _sink
+        if sink is None:
+            return func(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        data = bound.arguments.get('df_in', bound.arguments.get('full_list'))
+        rows_in = len(data) if data is not None else None
+        cols = bound.arguments.get('cols')
+        if cols is None and 'col' in bound.arguments:
+            cols = [bound.arguments['col']]
+        chars_in = _count_chars(data, cols)
+
+        started_tracing = False
+        if _trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            memory_before, _ = tracemalloc.get_traced_memory()
+
+        peak_memory_delta = None
+        try:
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            result = func(*args, **kwargs)
+            cpu_seconds = time.process_time() - cpu_start
+            wall_seconds = time.perf_counter() - wall_start
+
+            if _trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak_memory_delta = peak - memory_before
+        finally:
+            # Stop tracing even if the stage raised, but only when this call started it.
+            if started_tracing:
+                tracemalloc.stop()
+
+        # e.g. 'deduplication.unique_sentences' returns the unique sentences and the updated input.
+        output = result[0] if isinstance(result, tuple) else result
+        sink(StageRecord(
+            stage=stage_name,
+            wall_seconds=wall_seconds,
+            cpu_seconds=cpu_seconds,
+            rows_in=rows_in,
+            rows_out=len(output) if hasattr(output, '__len__') else None,
+            chars_in=chars_in,
+            peak_memory_delta_bytes=peak_memory_delta,
+        ))
+        return result
+
+    return wrapper
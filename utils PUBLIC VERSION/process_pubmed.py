@@ -1,6 +1,111 @@
+import bz2
+import gzip
+import io
+import lzma
+from typing import IO, Iterator
+
+import numpy as np
 import pandas as pd
 
+from .instrumentation import instrumented
+
+
+# Magic numbers at the start of the compressed file formats that can be read directly.
+_MAGIC_NUMBERS: dict[str, bytes] = {
+    'gzip': b'\x1f\x8b',
+    'zstd': b'\x28\xb5\x2f\xfd',
+    'bz2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+}
+
+
+def detect_compression(filename: str) -> str | None:
+    """Detects the compression of a file from its first bytes, rather than from its extension.
+
+    Args:
+        filename (str): path of the file.
+
+    Returns:
+        str | None: one of 'gzip', 'zstd', 'bz2' or 'xz', or None if the file isn't compressed.
+    """
+    with open(filename, 'rb') as f:
+        header = f.read(max(len(magic) for magic in _MAGIC_NUMBERS.values()))
+    for compression, magic in _MAGIC_NUMBERS.items():
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def open_compressed(filename: str, encoding: str | None = "utf8") -> IO:
+    """Opens a file for reading, decompressing it on the fly if it is compressed.
+
+    Args:
+        filename (str): path of the file, compressed or not.
+        encoding (str | None, optional): text encoding. Defaults to "utf8". If None the file is opened
+            in binary mode.
+
+    Returns:
+        IO: the open file, to be used in a 'with' statement.
+    """
+    compression = detect_compression(filename)
+
+    if compression == 'gzip':
+        f = gzip.open(filename, 'rb')
+    elif compression == 'bz2':
+        f = bz2.open(filename, 'rb')
+    elif compression == 'xz':
+        f = lzma.open(filename, 'rb')
+    elif compression == 'zstd':
+        # zstd isn't in the standard library, so the package is only needed for '.zst' files.
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(f"{filename} is zstd compressed, which requires the 'zstandard' package.") from e
+        f = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), closefd=True))
+    else:
+        f = open(filename, 'rb')
+
+    return f if encoding is None else io.TextIOWrapper(f, encoding=encoding)
+
+
+def iter_medline_lines(filename: str) -> Iterator[str | float]:
+    """Reads a MEDLINE file line by line, decompressing it on the fly if needed (see 'open_compressed').
+
+    The lines are stripped and blank lines are NaN, as in the list produced by 'pd.read_fwf' in the
+    notebook, so they can be fed to 'get_data'. Unlike 'pd.read_fwf', lines that read "NA", "None",
+    "null", etc. are kept as text rather than turned into NaN (which 'get_data' would take for the
+    end of an entry), and the file isn't read twice to find the longest line.
+
+    Args:
+        filename (str): path of the MEDLINE file, optionally compressed with gzip, zstd, bz2 or xz.
+
+    Yields:
+        str | float: each line, or NaN for a blank line.
+    """
+    with open_compressed(filename) as f:
+        for line in f:
+            line = line.strip()
+            yield line if line else np.nan
+
+
+@instrumented
+def read_medline(filename: str) -> list[str]:
+    """Reads a whole MEDLINE file, compressed or not, into the list of lines expected by 'get_data'.
+
+    Replaces the 'open' / 'pd.read_fwf' cell of the notebook:
+
+        full_list: list[str] = process_pubmed.read_medline('pubmed-machinelea-set.txt.gz')
+
+    Args:
+        filename (str): path of the MEDLINE file, optionally compressed with gzip, zstd, bz2 or xz.
+
+    Returns:
+        list[str]: one entry per line, with NaN for blank lines.
+    """
+    return list(iter_medline_lines(filename))
+
 
+@instrumented
 def get_data(full_list: list[str], field_dict: dict[str, str], df_orig: pd.DataFrame) -> pd.DataFrame:
     lenX: int = len(full_list)
 
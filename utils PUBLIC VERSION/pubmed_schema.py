@@ -0,0 +1,121 @@
+"""Typed schema for the PubMed fields returned by 'process_pubmed.get_data' and 'pubmed_xml'.
+
+Every field is parsed as a string. 'apply_schema' converts, after parsing:
+
+* the date fields into datetime columns (parsed in a vectorized way, so 'df[df['Entrez Date'] >= '2020']'
+  and topics over time don't re-parse strings),
+* the low cardinality fields (language, publication type, journal, ...) into categoricals, so each
+  distinct value is stored once,
+* the rarely populated fields into pyarrow backed strings, in which a missing value only takes a
+  validity bit and an offset, rather than a pointer to a NaN object.
+
+    df_orig = pubmed_schema.apply_schema(df_orig)
+"""
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrumented
+from .pubmed_field_definitions import definitions
+
+
+# Date fields and the regular expression extracting their components. The MEDLINE formats are:
+#   DP                    "2023 Dec 15", "2023 Dec", "2023 Nov-Dec", "2023 Winter" or "2023"
+#   EDAT, MHDA, CRDT, PMCR "2023/12/27 12:43" or "2023/12/27"
+#   LR, DCOM, DA, DEP      "20231215"
+# Only the start of the value is matched, so trailing text (e.g. the second month of "Nov-Dec") is ignored.
+_PUBLICATION_DATE = r'^\s*(?P<year>\d{4})(?:\s+(?P<month>[A-Za-z]{3})[A-Za-z]*)?(?:\s+(?P<day>\d{1,2})\b)?'
+_HISTORY_DATE = r'^\s*(?P<year>\d{4})/(?P<month>\d{1,2})/(?P<day>\d{1,2})(?:\s+(?P<hour>\d{1,2}):(?P<minute>\d{2}))?'
+_NUMERIC_DATE = r'^\s*(?P<year>\d{4})(?P<month>\d{2})(?P<day>\d{2})'
+
+DATE_FIELDS: dict[str, str] = {
+    'DP': _PUBLICATION_DATE,
+    'EDAT': _HISTORY_DATE,
+    'MHDA': _HISTORY_DATE,
+    'CRDT': _HISTORY_DATE,
+    'PMCR': _HISTORY_DATE,
+    'LR': _NUMERIC_DATE,
+    'DCOM': _NUMERIC_DATE,
+    'DA': _NUMERIC_DATE,
+    'DEP': _NUMERIC_DATE,
+}
+
+# Fields with few distinct values, repeated across many papers.
+CATEGORICAL_FIELDS: list[str] = ['LA', 'PT', 'JT', 'TA', 'JID', 'IS', 'PL', 'STAT', 'OWN', 'PST', 'PUBM', 'SB', 'OTO']
+
+# Columns populated in fewer than this fraction of the rows are stored as pyarrow backed strings.
+SPARSE_THRESHOLD: float = 0.05
+
+_MONTHS: dict[str, str] = {
+    'jan': '01', 'feb': '02', 'mar': '03', 'apr': '04', 'may': '05', 'jun': '06',
+    'jul': '07', 'aug': '08', 'sep': '09', 'oct': '10', 'nov': '11', 'dec': '12',
+}
+
+
+def parse_dates(dates: pd.Series, pattern: str) -> pd.Series:
+    """Parses a column of MEDLINE dates into datetimes, without a Python level loop over the rows.
+
+    Missing components default to the first month, day, hour or minute, e.g. "2023" becomes
+    2023-01-01 and "2023 Nov-Dec" becomes 2023-11-01. Values that can't be parsed become NaT.
+
+    Args:
+        dates (pd.Series): the dates, as strings.
+        pattern (str): regular expression with the named groups 'year' and optionally 'month'
+            (a number or a three letter month name), 'day', 'hour' and 'minute'. See 'DATE_FIELDS'.
+
+    Returns:
+        pd.Series: the dates, as 'datetime64[ns]'.
+    """
+    # Most dates are shared by many papers, so only the distinct values are parsed.
+    codes, uniques = pd.factorize(dates)
+    parts = pd.Series(uniques, dtype='string').str.extract(pattern)
+
+    def component(name: str) -> pd.Series:
+        if name not in parts:
+            return pd.Series('00' if name in ('hour', 'minute') else '01', index=parts.index, dtype='string')
+        values = parts[name]
+        if name == 'month':
+            # Month names become numbers. Anything else, e.g. seasons, is treated as missing.
+            values = values.where(values.str.isdigit(), values.str.lower().map(_MONTHS, na_action='ignore'))
+        return values.str.zfill(2).fillna('00' if name in ('hour', 'minute') else '01')
+
+    text = (parts['year'] + '-' + component('month') + '-' + component('day') + ' ' + component('hour') + ':' + component('minute'))
+    parsed = pd.to_datetime(text, format='%Y-%m-%d %H:%M', errors='coerce').to_numpy()
+
+    # Missing dates have the code -1.
+    values = np.append(parsed, np.datetime64('NaT', 'ns'))[codes]
+    return pd.Series(values, index=dates.index, name=dates.name)
+
+
+@instrumented
+def apply_schema(df_in: pd.DataFrame, sparse_threshold: float = SPARSE_THRESHOLD) -> pd.DataFrame:
+    """Converts the parsed PubMed fields to typed columns: dates, categoricals and pyarrow strings.
+
+    Columns not named after a field in 'pubmed_field_definitions.definitions()' (e.g. those added by
+    the cleaning pipeline) are left as they are, as are the fields that are populated often and have
+    many distinct values (titles, abstracts, ...).
+
+    Args:
+        df_in (pd.DataFrame): DataFrame as returned by 'process_pubmed.get_data' or 'pubmed_xml'.
+        sparse_threshold (float, optional): columns populated in fewer than this fraction of the rows
+            are stored as 'pd.StringDtype("pyarrow")'. Defaults to SPARSE_THRESHOLD.
+
+    Returns:
+        pd.DataFrame: the typed DataFrame (a new DataFrame, 'df_in' is not modified).
+    """
+    names = {tag: name for name, tag in definitions().items()}
+    date_cols = {names[tag]: pattern for tag, pattern in DATE_FIELDS.items()}
+    categorical_cols = {names[tag] for tag in CATEGORICAL_FIELDS}
+
+    columns = {}
+    for col in df_in.columns:
+        values = df_in[col]
+        if col in date_cols:
+            columns[col] = parse_dates(values, date_cols[col])
+        elif col in categorical_cols:
+            columns[col] = values.astype('category')
+        elif col in names.values() and len(values) > 0 and values.notna().mean() < sparse_threshold:
+            columns[col] = values.astype(pd.StringDtype('pyarrow'))
+        else:
+            columns[col] = values
+
+    return pd.DataFrame(columns, index=df_in.index)
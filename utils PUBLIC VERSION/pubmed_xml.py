@@ -0,0 +1,249 @@
+"""Streaming parser for PubMed XML, as served by efetch and in the annual baseline / daily update files.
+
+An alternative to 'process_pubmed.get_data' (which parses the MEDLINE text export) that produces a
+DataFrame with the same columns, i.e. the keys of 'pubmed_field_definitions.definitions()'. The
+XML is read incrementally and every article is discarded once converted, so memory use stays flat
+however large the file is. Compressed files (e.g. 'pubmed24n0001.xml.gz') are read directly:
+
+    for df_batch in pubmed_xml.iter_batches('pubmed24n0001.xml.gz', batch_size=10000):
+        ...
+"""
+import xml.etree.ElementTree as ET
+from typing import Callable, Iterator
+
+import pandas as pd
+
+from .instrumentation import instrumented
+from .process_pubmed import open_compressed
+from .pubmed_field_definitions import definitions
+
+
+# PubMed XML dates, as MEDLINE formats them: numeric months for 'DateCompleted' style dates and
+# three letter month names for the publication date.
+_MONTHS: list[str] = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def _text(element: ET.Element | None) -> str:
+    """Returns all the text inside an element (including that of inline markup such as <i>), stripped."""
+    if element is None:
+        return ''
+    return ' '.join(''.join(element.itertext()).split())
+
+
+def _abstract(element: ET.Element) -> str:
+    # Structured abstracts are split into labelled sections. The MEDLINE export writes them as
+    # "BACKGROUND: ... METHODS: ...", which 'cleaning_pipeline.remove_uppercase_colon_phrases' relies on.
+    sections = []
+    for section in element.findall('AbstractText'):
+        label = section.get('Label')
+        sections.append(f"{label}: {_text(section)}" if label else _text(section))
+    return ' '.join(sections)
+
+
+def _author(element: ET.Element) -> str:
+    # e.g. "Smith JA"
+    return ' '.join(filter(None, [_text(element.find('LastName')), _text(element.find('Initials'))]))
+
+
+def _full_author(element: ET.Element) -> str:
+    # e.g. "Smith, John A"
+    return ', '.join(filter(None, [_text(element.find('LastName')), _text(element.find('ForeName'))]))
+
+
+def _numeric_date(element: ET.Element) -> str:
+    # e.g. "20231215"
+    return ''.join(_text(element.find(part)).zfill(2) for part in ('Year', 'Month', 'Day'))
+
+
+def _history_date(element: ET.Element) -> str:
+    # e.g. "2023/12/15 06:42"
+    date = '/'.join(_text(element.find(part)).zfill(2) for part in ('Year', 'Month', 'Day'))
+    if element.find('Hour') is not None:
+        date += ' ' + ':'.join(_text(element.find(part)).zfill(2) for part in ('Hour', 'Minute'))
+    return date
+
+
+def _publication_date(element: ET.Element) -> str:
+    # e.g. "2023 Dec 15", or free text such as "2023 Nov-Dec" in <MedlineDate>.
+    if element.find('MedlineDate') is not None:
+        return _text(element.find('MedlineDate'))
+    month = _text(element.find('Month'))
+    if month.isdigit():
+        month = _MONTHS[int(month) - 1]
+    return ' '.join(filter(None, [_text(element.find('Year')), month, _text(element.find('Day'))]))
+
+
+def _mesh_heading(element: ET.Element) -> str:
+    # e.g. "Retina/*diagnostic imaging", where '*' marks a major topic.
+    def term(name: ET.Element) -> str:
+        return ('*' if name.get('MajorTopicYN') == 'Y' else '') + _text(name)
+
+    return '/'.join([term(element.find('DescriptorName'))] + [term(q) for q in element.findall('QualifierName')])
+
+
+def _identifier(element: ET.Element) -> str:
+    # e.g. "10.1016/j.ophtha.2023.01.001 [doi]"
+    return f"{_text(element)} [{element.get('IdType') or element.get('EIdType')}]"
+
+
+def _article_id(element: ET.Element) -> str:
+    # e.g. "S0161-6420(23)00001-1 [pii]", or nothing for the ids that 'AID' doesn't list.
+    return _identifier(element) if element.get('IdType') in _ARTICLE_ID_TYPES else ''
+
+
+def _grant(element: ET.Element) -> str:
+    # e.g. "R01 EY012345/EY/NEI NIH HHS/United States"
+    return '/'.join(filter(None, (_text(element.find(part)) for part in ('GrantID', 'Acronym', 'Agency', 'Country'))))
+
+
+def _chemical(element: ET.Element) -> str:
+    # e.g. "0 (Angiogenesis Inhibitors)"
+    return f"{_text(element.find('RegistryNumber'))} ({_text(element.find('NameOfSubstance'))})"
+
+
+# MEDLINE field tag -> field name, e.g. 'AB' -> 'Abstract'.
+_NAMES: dict[str, str] = {tag: name for name, tag in definitions().items()}
+
+# Columns of the DataFrames, in the order of 'process_pubmed.get_data'.
+_COLUMNS: list[str] = list(definitions())
+
+# The article ids listed in the MEDLINE 'AID' field. The PubMed and PMC ids have fields of their own.
+_ARTICLE_ID_TYPES: tuple[str, ...] = ('doi', 'pii')
+
+# How each MEDLINE field is found in a <PubmedArticle>: the field's tag (a value in 'definitions()'),
+# an ElementTree path relative to the <PubmedArticle> element, and the function converting each
+# matching element to text in the MEDLINE export format.
+_FIELDS: list[tuple[str, str, Callable[[ET.Element], str]]] = [
+    ('PMID', 'MedlineCitation/PMID', _text),
+    ('OWN', 'MedlineCitation', lambda e: e.get('Owner', '')),
+    ('STAT', 'MedlineCitation', lambda e: e.get('Status', '')),
+    ('DCOM', 'MedlineCitation/DateCompleted', _numeric_date),
+    ('LR', 'MedlineCitation/DateRevised', _numeric_date),
+    ('IS', 'MedlineCitation/Article/Journal/ISSN', _text),
+    ('VI', 'MedlineCitation/Article/Journal/JournalIssue/Volume', _text),
+    ('IP', 'MedlineCitation/Article/Journal/JournalIssue/Issue', _text),
+    ('DP', 'MedlineCitation/Article/Journal/JournalIssue/PubDate', _publication_date),
+    ('JT', 'MedlineCitation/Article/Journal/Title', _text),
+    ('TI', 'MedlineCitation/Article/ArticleTitle', _text),
+    ('TT', 'MedlineCitation/Article/VernacularTitle', _text),
+    ('PG', 'MedlineCitation/Article/Pagination/MedlinePgn', _text),
+    ('LID', 'MedlineCitation/Article/ELocationID', _identifier),
+    ('AB', 'MedlineCitation/Article/Abstract', _abstract),
+    ('CI', 'MedlineCitation/Article/Abstract/CopyrightInformation', _text),
+    ('FAU', 'MedlineCitation/Article/AuthorList/Author[LastName]', _full_author),
+    ('AU', 'MedlineCitation/Article/AuthorList/Author[LastName]', _author),
+    ('CN', 'MedlineCitation/Article/AuthorList/Author/CollectiveName', _text),
+    ('AD', 'MedlineCitation/Article/AuthorList/Author/AffiliationInfo/Affiliation', _text),
+    ('LA', 'MedlineCitation/Article/Language', _text),
+    ('GR', 'MedlineCitation/Article/GrantList/Grant', _grant),
+    ('PT', 'MedlineCitation/Article/PublicationTypeList/PublicationType', _text),
+    ('DEP', "MedlineCitation/Article/ArticleDate[@DateType='Electronic']", _numeric_date),
+    ('PUBM', 'MedlineCitation/Article', lambda e: e.get('PubModel', '')),
+    ('PL', 'MedlineCitation/MedlineJournalInfo/Country', _text),
+    ('TA', 'MedlineCitation/MedlineJournalInfo/MedlineTA', _text),
+    ('JID', 'MedlineCitation/MedlineJournalInfo/NlmUniqueID', _text),
+    ('RF', 'MedlineCitation/NumberOfReferences', _text),
+    ('RN', 'MedlineCitation/ChemicalList/Chemical', _chemical),
+    ('SB', 'MedlineCitation/CitationSubset', _text),
+    ('MH', 'MedlineCitation/MeshHeadingList/MeshHeading', _mesh_heading),
+    ('OTO', 'MedlineCitation/KeywordList', lambda e: e.get('Owner', '')),
+    ('OT', 'MedlineCitation/KeywordList/Keyword', _text),
+    ('GN', 'MedlineCitation/GeneralNote', _text),
+    ('COIS', 'MedlineCitation/CoiStatement', _text),
+    ('OAB', 'MedlineCitation/OtherAbstract', _abstract),
+    ('EDAT', "PubmedData/History/PubMedPubDate[@PubStatus='pubmed']", _history_date),
+    ('MHDA', "PubmedData/History/PubMedPubDate[@PubStatus='medline']", _history_date),
+    ('CRDT', "PubmedData/History/PubMedPubDate[@PubStatus='entrez']", _history_date),
+    ('PMCR', "PubmedData/History/PubMedPubDate[@PubStatus='pmc-release']", _history_date),
+    ('PHST', 'PubmedData/History/PubMedPubDate', lambda e: f"{_history_date(e)} [{e.get('PubStatus')}]"),
+    ('PST', 'PubmedData/PublicationStatus', _text),
+    ('AID', 'PubmedData/ArticleIdList/ArticleId', _article_id),
+    ('PMC', "PubmedData/ArticleIdList/ArticleId[@IdType='pmc']", _text),
+]
+
+
+def parse_article(article: ET.Element, multi_value_sep: str | None = None) -> dict[str, str]:
+    """Converts a single <PubmedArticle> element into a dictionary of MEDLINE fields.
+
+    Args:
+        article (ET.Element): the <PubmedArticle> element.
+        multi_value_sep (str | None, optional): separator used to join the values of fields that occur
+            more than once (authors, MeSH terms, publication types, ...). Defaults to None, which keeps
+            only the last value, as 'process_pubmed.get_data' does.
+
+    Returns:
+        dict[str, str]: the content of each field present, keyed by the field name (the keys of 'definitions()').
+    """
+    entry = {}
+    for tag, path, convert in _FIELDS:
+        values = [value for value in (convert(element) for element in article.findall(path)) if value]
+        if not values:
+            continue
+        entry[_NAMES[tag]] = values[-1] if multi_value_sep is None else multi_value_sep.join(values)
+    return entry
+
+
+def iter_articles(filename: str, multi_value_sep: str | None = None) -> Iterator[dict[str, str]]:
+    """Reads the articles of a PubMed XML file one at a time.
+
+    The file is parsed incrementally and each <PubmedArticle> element is cleared once converted, so
+    memory use doesn't grow with the size of the file. Book records (<PubmedBookArticle>) and the
+    <DeleteCitation> lists of the update files are skipped.
+
+    Args:
+        filename (str): path of the XML file, optionally compressed (see 'process_pubmed.open_compressed').
+        multi_value_sep (str | None, optional): see 'parse_article'. Defaults to None.
+
+    Yields:
+        dict[str, str]: the fields of each article, keyed by the field name.
+    """
+    with open_compressed(filename, encoding=None) as f:
+        root = None
+        for event, element in ET.iterparse(f, events=('start', 'end')):
+            if root is None:
+                root = element
+            if event != 'end' or element.tag not in ('PubmedArticle', 'PubmedBookArticle', 'DeleteCitation'):
+                continue
+
+            if element.tag == 'PubmedArticle':
+                yield parse_article(element, multi_value_sep)
+
+            # Drop the converted article, and the references the root keeps to it, to keep memory flat.
+            element.clear()
+            root.clear()
+
+
+def iter_batches(filename: str, batch_size: int = 10000, multi_value_sep: str | None = None) -> Iterator[pd.DataFrame]:
+    """Reads a PubMed XML file as a sequence of DataFrames of at most 'batch_size' articles.
+
+    Args:
+        filename (str): path of the XML file, optionally compressed (see 'process_pubmed.open_compressed').
+        batch_size (int, optional): maximum number of articles per DataFrame. Defaults to 10000.
+        multi_value_sep (str | None, optional): see 'parse_article'. Defaults to None.
+
+    Yields:
+        pd.DataFrame: one row per article and one column per field in 'definitions()' (whether
+        present in the file or not), like 'process_pubmed.get_data'.
+    """
+    batch = []
+    for entry in iter_articles(filename, multi_value_sep):
+        batch.append(entry)
+        if len(batch) == batch_size:
+            yield pd.DataFrame(batch, columns=_COLUMNS, dtype=object)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=_COLUMNS, dtype=object)
+
+
+@instrumented
+def read_xml(filename: str, multi_value_sep: str | None = None) -> pd.DataFrame:
+    """Reads a whole PubMed XML file into a DataFrame, the XML counterpart of 'process_pubmed.get_data'.
+
+    Args:
+        filename (str): path of the XML file, optionally compressed (see 'process_pubmed.open_compressed').
+        multi_value_sep (str | None, optional): see 'parse_article'. Defaults to None.
+
+    Returns:
+        pd.DataFrame: one row per article and one column per field in 'definitions()'.
+    """
+    return pd.DataFrame(list(iter_articles(filename, multi_value_sep)), columns=_COLUMNS, dtype=object)
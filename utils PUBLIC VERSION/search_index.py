@@ -0,0 +1,422 @@
+"""On-disk inverted index with BM25 ranking over the cleaned sentences.
+
+Typical use, after the cleaning pipeline (and 'cleaning_pipeline.normalize') has run:
+
+    search_index.build_index('sentence_index', df_orig, ['Abstract_split_normalized', 'Abstract_split_abbv'])
+
+    index = search_index.SearchIndex('sentence_index')
+    index.search('"optical coherence tomography angiography" u-net', require_all=True, years=(2018, 2023))
+
+New papers are added later with 'add_documents', which writes a new segment rather than rebuilding.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrumented
+
+
+INDEX_VERSION: int = 1
+
+# Gap left between the positions of consecutive text columns of a document, so that a phrase can't
+# match across the end of one column and the start of the next.
+_FIELD_GAP: int = 2
+
+# Phrase matching packs (document, position) into a single int64 key. Positions must stay below this.
+_POSITION_BITS: int = 32
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+_PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase index terms. Used both when indexing and when querying.
+
+    Args:
+        text (str): string of text to tokenize.
+
+    Returns:
+        list[str]: the terms, in order.
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _smallest_uint(max_value: int) -> np.dtype:
+    """Returns the narrowest unsigned integer dtype able to hold 'max_value'."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, 'meta.json'), 'r', encoding="utf8") as f:
+        return json.load(f)
+
+
+def _write_meta(path: str, meta: dict) -> None:
+    # Write to a temporary file first so a crash can't leave a half written 'meta.json' behind.
+    filename = os.path.join(path, 'meta.json')
+    with open(filename + '.tmp', 'w', encoding="utf8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(filename + '.tmp', filename)
+
+
+def _write_segment(segment_path: str, df_in: pd.DataFrame, text_cols: list[str], pmid_col: str | None, year_col: str | None) -> tuple[int, int]:
+    """Builds the postings of one batch of documents and writes them as a segment.
+
+    Files in a segment:
+        terms.json:     term -> [document frequency, byte offset in 'postings.bin', byte width,
+                        first entry in 'tfs.npy', first position in 'positions.npy'].
+        postings.bin:   per term, the delta encoded document ids, in the narrowest byte width
+                        (1, 2, 4 or 8 bytes) that holds the term's largest gap.
+        tfs.npy:        term frequency of each (term, document) entry.
+        positions.npy:  token positions of each entry, 'tf' of them per entry.
+        lengths.npy, pmids.npy, years.npy: per document length (in terms), PMID (-1 if unknown)
+                        and publication year (0 if unknown).
+
+    Args:
+        segment_path (str): directory to write the segment to.
+        df_in (pd.DataFrame): Pandas DataFrame containing the documents, one per row.
+        text_cols (list[str]): columns whose text is indexed.
+        pmid_col (str | None): column holding the PMID, or None.
+        year_col (str | None): column holding the publication year or date, or None.
+
+    Returns:
+        tuple[int, int]: number of documents and total number of terms written.
+    """
+    n_docs = len(df_in)
+    tokens: list[str] = []
+    docs: list[int] = []
+    positions: list[int] = []
+    lengths = np.zeros(n_docs, dtype=np.int64)
+
+    for doc, texts in enumerate(zip(*[df_in[col].tolist() for col in text_cols])):
+        position = 0
+        for text in texts:
+            if not isinstance(text, str):
+                continue
+            terms = tokenize(text)
+            tokens.extend(terms)
+            docs.extend([doc] * len(terms))
+            positions.extend(range(position, position + len(terms)))
+            position += len(terms) + _FIELD_GAP
+            lengths[doc] += len(terms)
+
+    term_ids, vocabulary = pd.factorize(pd.Series(tokens, dtype=object))
+    docs_arr = np.asarray(docs, dtype=np.int64)
+    positions_arr = np.asarray(positions, dtype=np.int64)
+
+    if len(positions_arr) and positions_arr.max() >= 2**_POSITION_BITS:
+        raise ValueError("A document is too long to be indexed.")
+
+    # Sort the tokens by term, then document, then position.
+    order = np.lexsort((positions_arr, docs_arr, term_ids))
+    term_ids, docs_arr, positions_arr = term_ids[order], docs_arr[order], positions_arr[order]
+
+    # One entry per distinct (term, document) pair.
+    is_entry_start = np.ones(len(term_ids), dtype=bool)
+    is_entry_start[1:] = (term_ids[1:] != term_ids[:-1]) | (docs_arr[1:] != docs_arr[:-1])
+    entry_starts = np.flatnonzero(is_entry_start)
+    entry_terms = term_ids[entry_starts]
+    entry_docs = docs_arr[entry_starts]
+    tfs = np.diff(np.append(entry_starts, len(term_ids)))
+
+    # Per term: first entry, document frequency and first position.
+    term_entry_starts = np.flatnonzero(np.append(True, entry_terms[1:] != entry_terms[:-1]))
+    document_frequencies = np.diff(np.append(term_entry_starts, len(entry_terms)))
+    term_position_starts = entry_starts[term_entry_starts]
+
+    # Delta encode the document ids within each term.
+    deltas = entry_docs.copy()
+    not_first = np.ones(len(entry_docs), dtype=bool)
+    not_first[term_entry_starts] = False
+    deltas[not_first] = entry_docs[not_first] - entry_docs[np.flatnonzero(not_first) - 1]
+
+    max_delta = np.maximum.reduceat(deltas, term_entry_starts) if len(deltas) else np.zeros(0, dtype=np.int64)
+    widths = np.array([_smallest_uint(int(m)).itemsize for m in max_delta], dtype=np.int64)
+
+    # Group the terms by byte width, so each group can be written with a single 'tobytes'.
+    entry_widths = np.repeat(widths, document_frequencies)
+    byte_offsets = np.zeros(len(vocabulary), dtype=np.int64)
+    os.makedirs(segment_path)
+    with open(os.path.join(segment_path, 'postings.bin'), 'wb') as f:
+        offset = 0
+        for width in (1, 2, 4, 8):
+            in_group = widths == width
+            if not in_group.any():
+                continue
+            group_bytes = width * document_frequencies[in_group]
+            byte_offsets[in_group] = offset + np.cumsum(group_bytes) - group_bytes
+            f.write(deltas[entry_widths == width].astype(f'<u{width}').tobytes())
+            offset += int(group_bytes.sum())
+
+    terms = {
+        term: [int(df), int(byte_offset), int(width), int(entry_start), int(position_start)]
+        for term, df, byte_offset, width, entry_start, position_start in zip(
+            vocabulary, document_frequencies, byte_offsets, widths, term_entry_starts, term_position_starts
+        )
+    }
+    with open(os.path.join(segment_path, 'terms.json'), 'w', encoding="utf8") as f:
+        json.dump(terms, f)
+
+    np.save(os.path.join(segment_path, 'tfs.npy'), tfs.astype(_smallest_uint(int(tfs.max()) if len(tfs) else 0)))
+    np.save(os.path.join(segment_path, 'positions.npy'), positions_arr.astype(_smallest_uint(int(positions_arr.max()) if len(positions_arr) else 0)))
+    np.save(os.path.join(segment_path, 'lengths.npy'), lengths.astype(np.uint32))
+
+    if pmid_col is not None:
+        # The MEDLINE parser can leave trailing text after the PMID, so only the leading digits are used.
+        pmids = pd.to_numeric(df_in[pmid_col].astype('string').str.extract(r'^\s*(\d+)', expand=False), errors='coerce')
+        np.save(os.path.join(segment_path, 'pmids.npy'), pmids.fillna(-1).to_numpy(dtype=np.int64))
+    else:
+        np.save(os.path.join(segment_path, 'pmids.npy'), np.full(n_docs, -1, dtype=np.int64))
+
+    if year_col is not None:
+        years = df_in[year_col]
+        if pd.api.types.is_datetime64_any_dtype(years):
+            years = years.dt.year
+        else:
+            years = pd.to_numeric(years.astype('string').str.extract(r'((?:19|20)\d{2})', expand=False), errors='coerce')
+        np.save(os.path.join(segment_path, 'years.npy'), years.fillna(0).to_numpy(dtype=np.int16))
+    else:
+        np.save(os.path.join(segment_path, 'years.npy'), np.zeros(n_docs, dtype=np.int16))
+
+    return n_docs, int(lengths.sum())
+
+
+@instrumented
+def add_documents(path: str, df_in: pd.DataFrame, text_cols: list[str], pmid_col: str | None = None,
+                  year_col: str | None = None) -> pd.DataFrame:
+    """Adds documents to the index at 'path', creating the index if it doesn't exist yet.
+
+    Each call writes a new, immutable, segment, so adding the papers of a monthly update doesn't
+    rebuild what is already indexed. Documents get consecutive ids, continuing from the documents
+    already in the index, in the row order of 'df_in'.
+
+    Args:
+        path (str): directory of the index.
+        df_in (pd.DataFrame): Pandas DataFrame containing the documents, one per row (e.g. one per sentence).
+        text_cols (list[str]): columns whose text is indexed e.g. the normalized and the "_abbv" columns.
+        pmid_col (str | None, optional): column holding the PMID, used for filtering. Defaults to None.
+        year_col (str | None, optional): column holding the publication year or date, used for filtering. Defaults to None.
+
+    Returns:
+        pd.DataFrame: the original DataFrame.
+    """
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        meta = _read_meta(path)
+        if meta['text_cols'] != text_cols:
+            raise ValueError(f"The index was built from {meta['text_cols']}, not {text_cols}.")
+    else:
+        os.makedirs(path, exist_ok=True)
+        meta = {'version': INDEX_VERSION, 'text_cols': text_cols, 'n_docs': 0, 'total_length': 0, 'segments': []}
+
+    name = f"segment_{len(meta['segments']):05d}"
+    n_docs, total_length = _write_segment(os.path.join(path, name), df_in, text_cols, pmid_col, year_col)
+
+    meta['segments'].append({'name': name, 'base': meta['n_docs'], 'n_docs': n_docs})
+    meta['n_docs'] += n_docs
+    meta['total_length'] += total_length
+    _write_meta(path, meta)
+
+    return df_in
+
+
+def build_index(path: str, df_in: pd.DataFrame, text_cols: list[str], pmid_col: str | None = None,
+                year_col: str | None = None) -> pd.DataFrame:
+    """Builds a new index at 'path' from the documents in 'df_in'.
+
+    Args:
+        path (str): directory of the index. Must not already contain an index.
+        df_in (pd.DataFrame): Pandas DataFrame containing the documents, one per row (e.g. one per sentence).
+        text_cols (list[str]): columns whose text is indexed e.g. the normalized and the "_abbv" columns.
+        pmid_col (str | None, optional): column holding the PMID, used for filtering. Defaults to None.
+        year_col (str | None, optional): column holding the publication year or date, used for filtering. Defaults to None.
+
+    Returns:
+        pd.DataFrame: the original DataFrame.
+    """
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        raise FileExistsError(f"An index already exists at {path}. Use 'add_documents' to update it.")
+    return add_documents(path, df_in, text_cols, pmid_col, year_col)
+
+
+def _load_array(filename: str) -> np.ndarray:
+    """Memory-maps a '.npy' file, falling back to a normal load for empty arrays (which can't be mapped)."""
+    array = np.load(filename, mmap_mode='r')
+    return array if array.size else np.load(filename)
+
+
+class _Segment:
+    """Read-only, memory-mapped view of one segment of the index."""
+
+    def __init__(self, path: str, base: int) -> None:
+        self.base = base
+        with open(os.path.join(path, 'terms.json'), 'r', encoding="utf8") as f:
+            self.terms: dict[str, list[int]] = json.load(f)
+
+        postings = os.path.join(path, 'postings.bin')
+        self.postings = np.memmap(postings, dtype=np.uint8, mode='r') if os.path.getsize(postings) else np.zeros(0, dtype=np.uint8)
+        self.tfs = _load_array(os.path.join(path, 'tfs.npy'))
+        self.positions = _load_array(os.path.join(path, 'positions.npy'))
+        self.lengths = _load_array(os.path.join(path, 'lengths.npy'))
+        self.pmids = _load_array(os.path.join(path, 'pmids.npy'))
+        self.years = _load_array(os.path.join(path, 'years.npy'))
+
+    def postings_for(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the (segment local) document ids containing 'term' and the term frequency in each."""
+        if term not in self.terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        df, byte_offset, width, entry_start, _ = self.terms[term]
+        deltas = np.frombuffer(self.postings, dtype=f'<u{width}', count=df, offset=byte_offset)
+        return np.cumsum(deltas, dtype=np.int64), self.tfs[entry_start:entry_start + df].astype(np.int64)
+
+    def positions_for(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Returns one (segment local document id, position) pair per occurrence of 'term'."""
+        docs, tfs = self.postings_for(term)
+        if len(docs) == 0:
+            return docs, docs
+        position_start = self.terms[term][4]
+        positions = self.positions[position_start:position_start + int(tfs.sum())].astype(np.int64)
+        return np.repeat(docs, tfs), positions
+
+
+class SearchIndex:
+    """Queries an index built with 'build_index' / 'add_documents'.
+
+    Postings and per document arrays are memory-mapped, so opening the index only reads the term
+    dictionaries and each query only touches the postings of its own terms.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75) -> None:
+        """Opens the index.
+
+        Args:
+            path (str): directory of the index.
+            k1 (float, optional): BM25 term frequency saturation. Defaults to 1.2.
+            b (float, optional): BM25 document length normalization. Defaults to 0.75.
+        """
+        meta = _read_meta(path)
+        if meta['version'] != INDEX_VERSION:
+            raise ValueError(f"Index version {meta['version']} is not supported (expected {INDEX_VERSION}).")
+
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.n_docs: int = meta['n_docs']
+        self.average_length: float = meta['total_length'] / meta['n_docs'] if meta['n_docs'] else 0.
+        self.segments = [_Segment(os.path.join(path, segment['name']), segment['base']) for segment in meta['segments']]
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def _postings(self, term: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the global document ids, term frequencies and document lengths for 'term'."""
+        docs, tfs, lengths = [], [], []
+        for segment in self.segments:
+            segment_docs, segment_tfs = segment.postings_for(term)
+            docs.append(segment_docs + segment.base)
+            tfs.append(segment_tfs)
+            lengths.append(segment.lengths[segment_docs].astype(np.float64))
+        if not docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(docs), np.concatenate(tfs), np.concatenate(lengths)
+
+    def _phrase_docs(self, terms: list[str]) -> np.ndarray:
+        """Returns the global ids of the documents containing 'terms' as consecutive tokens."""
+        matches = []
+        for segment in self.segments:
+            keys = None
+            for offset, term in enumerate(terms):
+                docs, positions = segment.positions_for(term)
+                # Align each occurrence on the phrase start, so all terms of a match share one key.
+                term_keys = np.unique((docs << _POSITION_BITS) + positions - offset + len(terms))
+                keys = term_keys if keys is None else np.intersect1d(keys, term_keys, assume_unique=True)
+                if len(keys) == 0:
+                    break
+            if keys is not None and len(keys):
+                matches.append(np.unique(keys >> _POSITION_BITS) + segment.base)
+        return np.concatenate(matches) if matches else np.zeros(0, dtype=np.int64)
+
+    def _attribute(self, docs: np.ndarray, name: str) -> np.ndarray:
+        """Looks up a per document array ('pmids', 'years' or 'lengths') for global document ids."""
+        values = np.zeros(len(docs), dtype=np.int64)
+        for segment in self.segments:
+            in_segment = (docs >= segment.base) & (docs < segment.base + len(segment.lengths))
+            values[in_segment] = getattr(segment, name)[docs[in_segment] - segment.base]
+        return values
+
+    def search(self, query: str, k: int | None = 10, require_all: bool = False, pmids: list[int] | None = None,
+               years: tuple[int, int] | list[int] | None = None) -> pd.DataFrame:
+        """Ranks the documents matching 'query' with BM25.
+
+        Quoted parts of the query are phrases, which a document must contain. Every query term,
+        including those in phrases, contributes to the score. Query terms are tokenized like the
+        indexed text, so query the normalized columns with lemmas (e.g. "image" not "images").
+
+        Args:
+            query (str): the query e.g. '"optical coherence tomography angiography" u-net'.
+            k (int | None, optional): number of results to return. Defaults to 10. None returns all matches.
+            require_all (bool, optional): only match documents containing every query term. Defaults to False.
+            pmids (list[int] | None, optional): only match documents from these PMIDs. Defaults to None.
+            years (tuple[int, int] | list[int] | None, optional): an inclusive (first, last) year range,
+                or a list of years, to match documents from. Defaults to None.
+
+        Returns:
+            pd.DataFrame: columns 'doc_id', 'score', 'PMID' and 'year', best match first.
+        """
+        phrases = [tokenize(phrase) for phrase in _PHRASE_PATTERN.findall(query)]
+        terms = list(dict.fromkeys(tokenize(_PHRASE_PATTERN.sub(' ', query)) + [t for phrase in phrases for t in phrase]))
+
+        # Accumulate the scores over the distinct documents in the postings only, so a query costs
+        # O(m log m) in the total length m of its postings rather than growing with the index.
+        term_docs, term_scores = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+        required = None
+        for term in terms:
+            docs, tfs, lengths = self._postings(term)
+            idf = np.log(1. + (self.n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1. - self.b + self.b * lengths / self.average_length) if self.average_length else self.k1
+            term_docs.append(docs)
+            term_scores.append(idf * tfs * (self.k1 + 1.) / (tfs + norm))
+            if require_all:
+                required = docs if required is None else np.intersect1d(required, docs, assume_unique=True)
+
+        for phrase in phrases:
+            if phrase:
+                docs = self._phrase_docs(phrase)
+                required = docs if required is None else np.intersect1d(required, docs, assume_unique=True)
+
+        doc_ids, inverse = np.unique(np.concatenate(term_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(term_scores), minlength=len(doc_ids))
+        if required is not None:
+            # The documents of a term or a phrase are distinct, and so is their intersection.
+            keep = np.isin(doc_ids, required, assume_unique=True)
+            doc_ids, scores = doc_ids[keep], scores[keep]
+
+        if pmids is not None:
+            in_pmids = np.isin(self._attribute(doc_ids, 'pmids'), np.asarray(list(pmids), dtype=np.int64))
+            doc_ids, scores = doc_ids[in_pmids], scores[in_pmids]
+        if years is not None:
+            doc_years = self._attribute(doc_ids, 'years')
+            if isinstance(years, tuple):
+                in_years = (doc_years >= years[0]) & (doc_years <= years[1])
+            else:
+                in_years = np.isin(doc_years, np.asarray(list(years)))
+            doc_ids, scores = doc_ids[in_years], scores[in_years]
+
+        # Only fully sort the top 'k'.
+        if k is not None and len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.lexsort((doc_ids, -scores))
+        doc_ids, scores = doc_ids[order], scores[order]
+
+        return pd.DataFrame({
+            'doc_id': doc_ids,
+            'score': scores,
+            'PMID': self._attribute(doc_ids, 'pmids'),
+            'year': self._attribute(doc_ids, 'years'),
+        })
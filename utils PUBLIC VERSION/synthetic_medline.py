@@ -0,0 +1,237 @@
+import random
+import textwrap
+from typing import Iterator
+
+
+# Vocabulary used to build synthetic abstracts. The words are chosen so that the generated text
+# exercises the cleaning pipeline: known abbreviations (see 'abbreviations.exact_replacements'),
+# domain specific spelling variants (see 'abbreviations.domain_specific_replacements') and the
+# uppercase section headings that 'cleaning_pipeline.remove_uppercase_colon_phrases' strips out.
+_SECTION_HEADINGS: list[str] = ['BACKGROUND', 'PURPOSE', 'METHODS', 'RESULTS', 'CONCLUSIONS', 'DESIGN, SETTING, AND PARTICIPANTS']
+
+_ABBREVIATIONS: list[str] = ['OCT', 'AI', 'AMD', 'DR', 'CNN', 'AUC', 'BCVA', 'SVM', 'VEGF', 'OCTA', 'VF', 'ROP']
+
+_DOMAIN_TERMS: list[str] = ['unet', 'U-net', 'ResNet50', 'Res-Net 101', 'inception v3', 'Inception-ResNet-v2', 'VGG-16', 'tele-medicine']
+
+_WORDS: list[str] = [
+    'deep', 'learning', 'model', 'retinal', 'fundus', 'images', 'patients', 'eyes', 'glaucoma', 'diabetic',
+    'retinopathy', 'macular', 'degeneration', 'segmentation', 'classification', 'accuracy', 'sensitivity',
+    'specificity', 'dataset', 'validation', 'training', 'performance', 'screening', 'automated', 'detection',
+    'choroidal', 'thickness', 'vessel', 'network', 'algorithm', 'clinical', 'cohort', 'prediction', 'layer',
+    'optical', 'coherence', 'tomography', 'photographs', 'visual', 'acuity', 'the', 'of', 'and', 'with', 'in',
+    'for', 'was', 'were', 'we', 'using', 'a', 'an', 'to', 'on', 'from', 'by', 'this', 'study', 'showed',
+]
+
+_JOURNALS: list[tuple[str, str]] = [
+    ('Ophthalmology', 'Ophthalmology'),
+    ('Br J Ophthalmol', 'The British journal of ophthalmology'),
+    ('Invest Ophthalmol Vis Sci', 'Investigative ophthalmology & visual science'),
+    ('Transl Vis Sci Technol', 'Translational vision science & technology'),
+    ('Sci Rep', 'Scientific reports'),
+    ('Eye (Lond)', 'Eye (London, England)'),
+]
+
+_PUBLICATION_TYPES: list[str] = ['Journal Article', 'Review', 'Research Support, Non-U.S. Gov\'t', 'Comparative Study']
+
+_MONTHS: list[str] = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+_SURNAMES: list[str] = ['Smith', 'Wang', 'Li', 'Garcia', 'Kim', 'Nguyen', 'Patel', 'Muller', 'Rossi', 'Tanaka']
+
+_FORENAMES: list[str] = ['John', 'Wei', 'Maria', 'Ji-Hoon', 'Anh', 'Priya', 'Hans', 'Giulia', 'Yuki', 'Sarah']
+
+
+def _field(tag: str, content: str) -> list[str]:
+    """Formats a single MEDLINE field, wrapping long content onto indented continuation lines.
+
+    The MEDLINE export pads the tag to four characters, follows it with '- ' and wraps the content
+    at 88 characters. Continuation lines are indented by six spaces.
+
+    Args:
+        tag (str): MEDLINE field tag e.g. 'AB'.
+        content (str): content of the field.
+
+    Returns:
+        list[str]: the lines making up the field.
+    """
+    return textwrap.wrap(
+        content,
+        width=88,
+        initial_indent=f"{tag:<4}- ",
+        subsequent_indent=' ' * 6,
+        break_long_words=False,
+        break_on_hyphens=False,
+    )
+
+
+def _sentence(rng: random.Random) -> str:
+    """Builds one synthetic sentence of abstract text.
+
+    Args:
+        rng (random.Random): seeded random number generator.
+
+    Returns:
+        str: a sentence ending with a period.
+    """
+    words = rng.choices(_WORDS, k=rng.randint(8, 30))
+
+    # Sprinkle in abbreviations and domain specific terms so that the cleaning stages have work to do.
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(len(words)), rng.choice(_ABBREVIATIONS))
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words)), rng.choice(_DOMAIN_TERMS))
+    if rng.random() < 0.1:
+        words.insert(rng.randrange(len(words)), f"({rng.choice(_ABBREVIATIONS)})")
+
+    return ' '.join(words).capitalize() + '.'
+
+
+def _abstract(rng: random.Random) -> str:
+    """Builds a synthetic abstract, optionally structured with uppercase section headings.
+
+    Args:
+        rng (random.Random): seeded random number generator.
+
+    Returns:
+        str: the abstract text.
+    """
+    if rng.random() < 0.6:
+        # Structured abstract e.g. "BACKGROUND: ... METHODS: ...".
+        headings = rng.sample(_SECTION_HEADINGS, k=rng.randint(2, 4))
+        sections = [f"{heading}: " + ' '.join(_sentence(rng) for _ in range(rng.randint(1, 4))) for heading in headings]
+        return ' '.join(sections)
+
+    return ' '.join(_sentence(rng) for _ in range(rng.randint(3, 12)))
+
+
+def generate_record(pmid: int, rng: random.Random, missing_abstract_rate: float = 0.05) -> list[str]:
+    """Builds the lines of a single synthetic MEDLINE record.
+
+    The record contains multi-line fields (title and abstract), repeated tags (authors, affiliations,
+    publication types, ISSNs) and tags that are not listed in 'pubmed_field_definitions.definitions'
+    (comments, errata, retractions and 'OABL'), some of them repeated or split over several lines,
+    just as a real PubMed export does.
+
+    Args:
+        pmid (int): PubMed unique identifier for the record.
+        rng (random.Random): seeded random number generator.
+        missing_abstract_rate (float, optional): probability that the record has no abstract. Defaults to 0.05.
+
+    Returns:
+        list[str]: the lines of the record, without a trailing blank line.
+    """
+    year = rng.randint(1995, 2023)
+    month = rng.randint(1, 12)
+    day = rng.randint(1, 28)
+    journal_abbreviation, journal_title = rng.choice(_JOURNALS)
+
+    lines: list[str] = []
+    lines += _field('PMID', str(pmid))
+    lines += _field('OWN', 'NLM')
+    lines += _field('STAT', rng.choice(['MEDLINE', 'PubMed-not-MEDLINE', 'Publisher']))
+    lines += _field('LR', f"{year + 1}{month:02d}{day:02d}")
+    lines += _field('IS', f"{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)} (Electronic)")
+    lines += _field('IS', f"{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)} (Linking)")
+    lines += _field('VI', str(rng.randint(1, 120)))
+    lines += _field('IP', str(rng.randint(1, 12)))
+    lines += _field('DP', f"{year} {_MONTHS[month - 1]} {day}" if rng.random() < 0.7 else f"{year} {_MONTHS[month - 1]}")
+    lines += _field('TI', ' '.join(rng.choices(_WORDS, k=rng.randint(8, 25))).capitalize() + '.')
+    lines += _field('PG', f"{rng.randint(1, 900)}-{rng.randint(901, 999)}")
+    lines += _field('LID', f"10.{rng.randint(1000, 9999)}/synthetic.{pmid} [doi]")
+
+    if rng.random() >= missing_abstract_rate:
+        lines += _field('AB', _abstract(rng))
+        if rng.random() < 0.3:
+            lines += _field('CI', f"(c) {year} The Author(s). This is an open access article.")
+
+    for _ in range(rng.randint(1, 8)):
+        surname = rng.choice(_SURNAMES)
+        forename = rng.choice(_FORENAMES)
+        lines += _field('FAU', f"{surname}, {forename}")
+        lines += _field('AU', f"{surname} {forename[0]}")
+        lines += _field('AD', f"Department of Ophthalmology, University Hospital {rng.randint(1, 500)}, City, Country.")
+
+    lines += _field('LA', 'eng')
+    for publication_type in rng.sample(_PUBLICATION_TYPES, k=rng.randint(1, 3)):
+        lines += _field('PT', publication_type)
+    lines += _field('DEP', f"{year}{month:02d}{day:02d}")
+    lines += _field('PL', 'England')
+    lines += _field('TA', journal_abbreviation)
+    lines += _field('JT', journal_title)
+    lines += _field('JID', str(rng.randint(7000000, 9999999)))
+    lines += _field('SB', 'IM')
+
+    # Tags that 'pubmed_field_definitions.definitions' does not list: the parser has to skip them,
+    # including their continuation lines.
+    for tag in ('CON', 'CIN', 'EIN', 'RIN'):
+        if rng.random() < 0.15:
+            for _ in range(rng.randint(1, 3)):
+                # Now and then a long citation that wraps onto continuation lines.
+                note = ' '.join(rng.choices(_WORDS, k=rng.randint(20, 30))) if rng.random() < 0.3 else ''
+                lines += _field(tag, f"{journal_abbreviation}. {rng.randint(1995, 2023)};{rng.randint(1, 120)}:{rng.randint(1, 999)}. "
+                                     f"{note} PMID: {rng.randint(10000000, 39999999)}".replace('  ', ' '))
+    if rng.random() < 0.05:
+        lines += _field('OABL', 'NOTNLM')
+    lines += _field('EDAT', f"{year}/{month:02d}/{day:02d} 06:00")
+    lines += _field('MHDA', f"{year}/{month:02d}/{day:02d} 06:01")
+    lines += _field('CRDT', f"{year}/{month:02d}/{day:02d} 03:20")
+    lines += _field('PHST', f"{year}/{month:02d}/{day:02d} 00:00 [received]")
+    lines += _field('AID', f"10.{rng.randint(1000, 9999)}/synthetic.{pmid} [doi]")
+    lines += _field('PST', rng.choice(['ppublish', 'epublish', 'aheadofprint']))
+    lines += _field('SO', f"{journal_abbreviation}. {year} {_MONTHS[month - 1]}.")
+
+    return lines
+
+
+def generate_records(n_records: int, seed: int = 42, missing_abstract_rate: float = 0.05) -> Iterator[list[str]]:
+    """Yields the lines of 'n_records' synthetic MEDLINE records.
+
+    The output is fully determined by 'seed', so that benchmark runs can be compared with each other.
+
+    Args:
+        n_records (int): number of records to generate.
+        seed (int, optional): seed for the random number generator. Defaults to 42.
+        missing_abstract_rate (float, optional): probability that a record has no abstract. Defaults to 0.05.
+
+    Yields:
+        Iterator[list[str]]: the lines of each record.
+    """
+    rng = random.Random(seed)
+    for i in range(n_records):
+        yield generate_record(30000000 + i, rng, missing_abstract_rate)
+
+
+def write_medline(filename: str, n_records: int, seed: int = 42, missing_abstract_rate: float = 0.05) -> None:
+    """Writes a synthetic MEDLINE file in the same format as the PubMed "Save > PubMed format" export.
+
+    Records are separated by a single blank line, just as the real export is.
+
+    Args:
+        filename (str): path of the file to write.
+        n_records (int): number of records to generate.
+        seed (int, optional): seed for the random number generator. Defaults to 42.
+        missing_abstract_rate (float, optional): probability that a record has no abstract. Defaults to 0.05.
+    """
+    with open(filename, 'w', encoding="utf8") as f:
+        for i, lines in enumerate(generate_records(n_records, seed, missing_abstract_rate)):
+            if i > 0:
+                f.write('\n')
+            f.write('\n'.join(lines))
+            f.write('\n')
+
+
+def generate_abstracts(n_records: int, seed: int = 42, missing_abstract_rate: float = 0.05) -> list[str | None]:
+    """Generates synthetic abstracts directly, without going through the MEDLINE text format.
+
+    Useful for benchmarking the cleaning stages at sizes where running the parser first would
+    dominate the run time.
+
+    Args:
+        n_records (int): number of abstracts to generate.
+        seed (int, optional): seed for the random number generator. Defaults to 42.
+        missing_abstract_rate (float, optional): probability that an abstract is missing. Defaults to 0.05.
+
+    Returns:
+        list[str | None]: the abstracts, with None in place of a missing abstract.
+    """
+    rng = random.Random(seed)
+    return [_abstract(rng) if rng.random() >= missing_abstract_rate else None for _ in range(n_records)]
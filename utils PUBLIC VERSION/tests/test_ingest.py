@@ -0,0 +1,122 @@
+"""Checks that 'ingest.iter_record_batches' parses every record of a MEDLINE file, whatever the batch size.
+
+Run from the directory containing the 'utils' package with:
+
+    python -m pytest utils/tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import ingest, process_pubmed, pubmed_field_definitions, synthetic_medline
+
+
+# Each record as its MEDLINE lines and the fields they should parse into. Long fields are split over
+# continuation lines, which are joined with a single space, and every record (in particular the
+# last one) ends with a multi-line field.
+RECORDS: list[tuple[list[str], dict[str, str]]] = [
+    (
+        [
+            'PMID- 30000001',
+            'TI  - Deep learning for retinal image',
+            '      segmentation.',
+            'AB  - Optical coherence tomography angiography is a non-invasive imaging',
+            '      technique. A U-Net was trained on 300 scans.',
+            'LA  - eng',
+            'SO  - Ophthalmology. 2020 Jan;127(1):12-14.',
+            '      doi: 10.1016/j.ophtha.2019.01.001.',
+        ],
+        {
+            'PubMed Unique Identifier': '30000001',
+            'Title': 'Deep learning for retinal image segmentation.',
+            'Abstract': 'Optical coherence tomography angiography is a non-invasive imaging technique. A U-Net was trained on 300 scans.',
+            'Language': 'eng',
+            'Source': 'Ophthalmology. 2020 Jan;127(1):12-14. doi: 10.1016/j.ophtha.2019.01.001.',
+        },
+    ),
+    (
+        [
+            'PMID- 30000002',
+            'TI  - Glaucoma detection from fundus photographs.',
+            'LA  - eng',
+            'SO  - Eye (Lond). 2021 Mar;35(3):800-808.',
+        ],
+        {
+            'PubMed Unique Identifier': '30000002',
+            'Title': 'Glaucoma detection from fundus photographs.',
+            'Language': 'eng',
+            'Source': 'Eye (Lond). 2021 Mar;35(3):800-808.',
+        },
+    ),
+    (
+        [
+            'PMID- 30000003',
+            'TI  - Diabetic retinopathy screening.',
+            'AB  - A convolutional neural network graded',
+            '      fundus images',
+            '      from 2000 patients.',
+            'DP  - 2019 Dec',
+            'JT  - Investigative ophthalmology & visual science',
+            'SO  - Invest Ophthalmol Vis Sci. 2019 Dec 1;60(15):5067-5074.',
+            '      doi: 10.1167/iovs.19-27434.',
+        ],
+        {
+            'PubMed Unique Identifier': '30000003',
+            'Title': 'Diabetic retinopathy screening.',
+            'Abstract': 'A convolutional neural network graded fundus images from 2000 patients.',
+            'Date of Publication': '2019 Dec',
+            'Journal Title': 'Investigative ophthalmology & visual science',
+            'Source': 'Invest Ophthalmol Vis Sci. 2019 Dec 1;60(15):5067-5074. doi: 10.1167/iovs.19-27434.',
+        },
+    ),
+] * 3
+
+BATCH_SIZES: list[int] = [1, 2, 3, 4, 7, 1000]
+
+# How the file ends after the last line of the last record.
+ENDINGS: dict[str, str] = {
+    'trailing_blank_line': '\n\n',
+    'newline': '\n',
+    'no_newline': '',
+}
+
+
+def _write(path, records: list[list[str]], ending: str) -> str:
+    path.write_text('\n\n'.join('\n'.join(lines) for lines in records) + ending, encoding='utf8')
+    return str(path)
+
+
+def _expected(records: list[dict[str, str]]) -> pd.DataFrame:
+    columns = list(pubmed_field_definitions.definitions().keys())
+    df = pd.DataFrame(records).reindex(columns=columns).astype(pd.StringDtype())
+    df.index = pd.RangeIndex(len(df), name='paper')
+    return df
+
+
+@pytest.mark.parametrize('ending', ENDINGS.values(), ids=ENDINGS.keys())
+@pytest.mark.parametrize('batch_size', BATCH_SIZES)
+def test_batches_match_records(tmp_path, ending: str, batch_size: int) -> None:
+    filename = _write(tmp_path / 'records.txt', [lines for lines, _ in RECORDS], ending)
+
+    batches = list(ingest.iter_record_batches(filename, batch_size))
+
+    assert [len(batch) for batch in batches[:-1]] == [batch_size] * (len(batches) - 1)
+    pd.testing.assert_frame_equal(pd.concat(batches), _expected([fields for _, fields in RECORDS]))
+
+
+@pytest.mark.parametrize('ending', ENDINGS.values(), ids=ENDINGS.keys())
+@pytest.mark.parametrize('batch_size', BATCH_SIZES)
+def test_synthetic_batches_match_single_records(tmp_path, ending: str, batch_size: int) -> None:
+    # Synthetic records have repeated tags and tags missing from the field definitions, so they are
+    # compared with each record parsed on its own.
+    records = list(synthetic_medline.generate_records(25, seed=7))
+    filename = _write(tmp_path / 'synthetic.txt', records, ending)
+
+    field_dict = pubmed_field_definitions.definitions()
+    expected = [
+        process_pubmed.get_data(lines + [np.nan, 'PMID- '], field_dict, pd.DataFrame()).iloc[0].to_dict()
+        for lines in records
+    ]
+
+    batches = ingest.iter_record_batches(filename, batch_size)
+    pd.testing.assert_frame_equal(pd.concat(batches), _expected(expected))
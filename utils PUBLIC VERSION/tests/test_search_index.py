@@ -0,0 +1,126 @@
+"""Checks the on-disk index of 'search_index' against a brute-force BM25 and a regex phrase match.
+
+Run from the directory containing the 'utils' package with:
+
+    python -m pytest utils/tests
+"""
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from .. import search_index
+
+
+VOCABULARY: list[str] = [
+    'retinal', 'image', 'deep', 'learning', 'network', 'optical', 'coherence', 'tomography', 'angiography',
+    'u-net', 'segmentation', 'model', 'glaucoma', 'diabetic', 'retinopathy', 'fundus', 'patient', 'study',
+]
+
+# Documents in the first segment. The rest of the corpus is added as a second segment.
+FIRST_SEGMENT: int = 400
+N_DOCS: int = 700
+
+
+@pytest.fixture(scope='module')
+def corpus() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    # Zipf-like word frequencies, so the document frequencies (and the idf) vary between terms.
+    weights = 1. / np.arange(1, len(VOCABULARY) + 1)
+    weights /= weights.sum()
+
+    def text(n_words: int) -> str:
+        return ' '.join(rng.choice(VOCABULARY, size=n_words, p=weights))
+
+    df = pd.DataFrame({
+        'title': [text(rng.integers(3, 8)) for _ in range(N_DOCS)],
+        'abstract': [text(rng.integers(5, 30)) if rng.random() > 0.05 else None for _ in range(N_DOCS)],
+        'PMID': [str(30000000 + i) for i in range(N_DOCS)],
+        'year': [str(2015 + i % 8) for i in range(N_DOCS)],
+    })
+
+    # A rare term whose document id gaps don't fit in a single byte, in both segments.
+    for doc in (2, 350, 420, 690):
+        df.loc[doc, 'abstract'] = f"{df.loc[doc, 'abstract'] or ''} vasculitis"
+    # A phrase split across the two columns of a document must not match.
+    df.loc[5, 'title'] = 'retinal image fundus'
+    df.loc[5, 'abstract'] = 'photography of the retina'
+    return df
+
+
+@pytest.fixture(scope='module')
+def index(corpus: pd.DataFrame, tmp_path_factory: pytest.TempPathFactory) -> search_index.SearchIndex:
+    path = str(tmp_path_factory.mktemp('index') / 'sentence_index')
+    search_index.build_index(path, corpus.iloc[:FIRST_SEGMENT], ['title', 'abstract'], pmid_col='PMID', year_col='year')
+    search_index.add_documents(path, corpus.iloc[FIRST_SEGMENT:], ['title', 'abstract'], pmid_col='PMID', year_col='year')
+    return search_index.SearchIndex(path)
+
+
+def _fields(corpus: pd.DataFrame) -> list[list[list[str]]]:
+    """The terms of every column of every document."""
+    return [[search_index.tokenize(text) if isinstance(text, str) else [] for text in row] for row in zip(corpus['title'], corpus['abstract'])]
+
+
+def _brute_force_bm25(corpus: pd.DataFrame, terms: list[str], k1: float = 1.2, b: float = 0.75) -> np.ndarray:
+    documents = [[term for field in fields for term in field] for fields in _fields(corpus)]
+    lengths = np.array([len(document) for document in documents], dtype=np.float64)
+    average_length = lengths.mean()
+
+    scores = np.zeros(len(documents))
+    for term in terms:
+        tfs = np.array([document.count(term) for document in documents], dtype=np.float64)
+        df = np.count_nonzero(tfs)
+        idf = np.log(1. + (len(documents) - df + 0.5) / (df + 0.5))
+        scores += idf * tfs * (k1 + 1.) / (tfs + k1 * (1. - b + b * lengths / average_length))
+    return scores
+
+
+def _brute_force_phrase(corpus: pd.DataFrame, phrase: str) -> np.ndarray:
+    pattern = re.compile(r'(?:^| )' + re.escape(' '.join(search_index.tokenize(phrase))) + r'(?: |$)')
+    return np.array([any(pattern.search(' '.join(field)) for field in fields) for fields in _fields(corpus)])
+
+
+def _check_ranking(result: pd.DataFrame, expected_scores: np.ndarray, expected_docs: np.ndarray) -> None:
+    expected = pd.Series(expected_scores[expected_docs], index=expected_docs).sort_index()
+    actual = result.set_index('doc_id')['score'].sort_index()
+
+    np.testing.assert_array_equal(actual.index.to_numpy(), expected.index.to_numpy())
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy(), rtol=1e-9)
+    # Best match first.
+    assert (np.diff(result['score'].to_numpy()) <= 0).all()
+
+
+@pytest.mark.parametrize('query', ['retinal', 'glaucoma segmentation', 'u-net fundus vasculitis', 'vasculitis', 'unknownterm'])
+def test_bm25_matches_brute_force(corpus: pd.DataFrame, index: search_index.SearchIndex, query: str) -> None:
+    terms = search_index.tokenize(query)
+    scores = _brute_force_bm25(corpus, terms)
+
+    # Every document containing a query term matches, even with a score of about zero.
+    matched = np.flatnonzero([any(term in field for field in fields for term in terms) for fields in _fields(corpus)])
+    _check_ranking(index.search(query, k=None), scores, matched)
+
+
+def test_require_all(corpus: pd.DataFrame, index: search_index.SearchIndex) -> None:
+    terms = ['glaucoma', 'segmentation']
+    matched = np.flatnonzero([all(any(term in field for field in fields) for term in terms) for fields in _fields(corpus)])
+    _check_ranking(index.search(' '.join(terms), k=None, require_all=True), _brute_force_bm25(corpus, terms), matched)
+
+
+@pytest.mark.parametrize('phrase', ['retinal image', 'deep learning network', 'image fundus photography', 'vasculitis'])
+def test_phrase_matches_regex(corpus: pd.DataFrame, index: search_index.SearchIndex, phrase: str) -> None:
+    matched = np.flatnonzero(_brute_force_phrase(corpus, phrase))
+    _check_ranking(index.search(f'"{phrase}"', k=None), _brute_force_bm25(corpus, search_index.tokenize(phrase)), matched)
+
+
+def test_top_k_and_filters(corpus: pd.DataFrame, index: search_index.SearchIndex) -> None:
+    scores = _brute_force_bm25(corpus, ['retinal'])
+    result = index.search('retinal', k=5)
+    np.testing.assert_allclose(result['score'].to_numpy(), np.sort(scores)[::-1][:5], rtol=1e-9)
+
+    result = index.search('retinal', k=None, years=(2016, 2017), pmids=[30000000 + i for i in range(0, N_DOCS, 3)])
+    has_term = np.array([any('retinal' in field for field in fields) for fields in _fields(corpus)])
+    in_filters = corpus['year'].astype(int).between(2016, 2017).to_numpy() & (np.arange(N_DOCS) % 3 == 0)
+    _check_ranking(result, scores, np.flatnonzero(has_term & in_filters))
+    np.testing.assert_array_equal(result['PMID'].to_numpy(), corpus['PMID'].astype(int).to_numpy()[result['doc_id']])
+    np.testing.assert_array_equal(result['year'].to_numpy(), corpus['year'].astype(int).to_numpy()[result['doc_id']])
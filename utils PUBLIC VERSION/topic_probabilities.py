@@ -0,0 +1,145 @@
+"""Sparse storage of the topic probabilities of every document (sentence).
+
+With 'calculate_probabilities=True' BERTopic returns a dense float64 matrix of documents by topics,
+almost all of which is negligible. After fitting, keep only the top-k probabilities of each
+document (and/or those above a threshold) in a float32 CSR matrix, and save it next to the dataset:
+
+    probs_sparse = topic_probabilities.sparsify(probs, top_k=5)
+    topic_probabilities.save(probs_sparse, 'topic_probabilities.npz')
+    del probs
+
+    probs_sparse = topic_probabilities.load('topic_probabilities.npz')
+    topic_model.visualize_distribution(topic_probabilities.dense_row(probs_sparse, 0))
+
+Row i of the matrix is document i (the order of 'docs', i.e. of the rows of 'df_orig') and column j is
+topic j, as in the 'probs' returned by BERTopic. Outliers (topic -1) have no column.
+"""
+from typing import Iterable
+
+import numpy as np
+import scipy.sparse
+
+from .instrumentation import instrumented
+
+
+def _sparsify_batch(batch: np.ndarray, top_k: int | None, threshold: float | None) -> scipy.sparse.csr_matrix:
+    """Keeps the top-k and/or above threshold probabilities of a batch of rows.
+
+    Args:
+        batch (np.ndarray): dense probabilities, one row per document.
+        top_k (int | None): number of probabilities to keep per row, or None to keep all.
+        threshold (float | None): minimum probability to keep, or None for no minimum.
+
+    Returns:
+        scipy.sparse.csr_matrix: the kept probabilities, as float32.
+    """
+    batch = np.asarray(batch, dtype=np.float32)
+    if batch.ndim == 1:
+        batch = batch[np.newaxis, :]
+
+    # Zero probabilities are never stored.
+    keep = batch > 0
+    if top_k is not None and top_k < batch.shape[1]:
+        # 'argpartition' finds the k largest values of each row without sorting the whole row.
+        top = np.argpartition(batch, -top_k, axis=1)[:, -top_k:]
+        in_top = np.zeros(batch.shape, dtype=bool)
+        np.put_along_axis(in_top, top, True, axis=1)
+        keep &= in_top
+    if threshold is not None:
+        keep &= batch >= threshold
+
+    # 'np.nonzero' returns the positions in row-major order, which is the order CSR needs.
+    rows, cols = np.nonzero(keep)
+    return scipy.sparse.csr_matrix((batch[rows, cols], (rows, cols)), shape=batch.shape, dtype=np.float32)
+
+
+@instrumented
+def sparsify(probs: np.ndarray | Iterable[np.ndarray], top_k: int | None = 5, threshold: float | None = None,
+             batch_size: int = 100_000) -> scipy.sparse.csr_matrix:
+    """Converts the topic probabilities into a sparse float32 CSR matrix.
+
+    The probabilities are processed 'batch_size' rows at a time, so the float32 copy and the masks
+    never cover the whole matrix. They can also be passed as an iterable of dense batches, computed
+    one at a time, so the dense matrix never exists at all, e.g. with 'calculate_probabilities=False':
+
+        reduced_embeddings = topic_model.umap_model.transform(embeddings)
+        batches = (hdbscan.prediction.membership_vector(topic_model.hdbscan_model, reduced_embeddings[i:i + 100_000])
+                   for i in range(0, len(reduced_embeddings), 100_000))
+        probs_sparse = topic_probabilities.sparsify(batches, top_k=5)
+
+    Args:
+        probs (np.ndarray | Iterable[np.ndarray]): dense probabilities, documents by topics, or
+            batches of consecutive rows of them.
+        top_k (int | None, optional): number of probabilities to keep per document. Defaults to 5.
+            None keeps all of them (subject to 'threshold').
+        threshold (float | None, optional): minimum probability to keep. Defaults to None.
+        batch_size (int, optional): number of rows processed at a time. Defaults to 100_000.
+
+    Returns:
+        scipy.sparse.csr_matrix: documents by topics, float32.
+    """
+    if top_k is None and threshold is None:
+        raise ValueError("At least one of 'top_k' and 'threshold' must be set.")
+    if top_k is not None and top_k < 1:
+        raise ValueError(f"'top_k' must be at least 1, got {top_k}.")
+
+    if isinstance(probs, np.ndarray):
+        batches = (probs[start:start + batch_size] for start in range(0, len(probs), batch_size))
+    else:
+        batches = iter(probs)
+
+    matrices = [_sparsify_batch(batch, top_k, threshold) for batch in batches]
+    if not matrices:
+        return scipy.sparse.csr_matrix((0, 0), dtype=np.float32)
+    return scipy.sparse.vstack(matrices, format='csr', dtype=np.float32)
+
+
+def save(matrix: scipy.sparse.csr_matrix, filename: str = 'topic_probabilities.npz') -> None:
+    """Saves the sparse topic probabilities (compressed).
+
+    Args:
+        matrix (scipy.sparse.csr_matrix): matrix as returned by 'sparsify'.
+        filename (str, optional): path of the file. Defaults to 'topic_probabilities.npz'.
+    """
+    scipy.sparse.save_npz(filename, matrix, compressed=True)
+
+
+def load(filename: str = 'topic_probabilities.npz') -> scipy.sparse.csr_matrix:
+    """Loads the sparse topic probabilities saved by 'save'.
+
+    Args:
+        filename (str, optional): path of the file. Defaults to 'topic_probabilities.npz'.
+
+    Returns:
+        scipy.sparse.csr_matrix: documents by topics, float32.
+    """
+    return scipy.sparse.load_npz(filename).tocsr()
+
+
+def dense_row(matrix: scipy.sparse.csr_matrix, row: int) -> np.ndarray:
+    """Returns the probabilities of a single document as a dense array (zero for the dropped topics).
+
+    For the visualizations that expect a row of the dense 'probs', e.g. 'topic_model.visualize_distribution'.
+
+    Args:
+        matrix (scipy.sparse.csr_matrix): matrix as returned by 'sparsify'.
+        row (int): position of the document.
+
+    Returns:
+        np.ndarray: one probability per topic.
+    """
+    return matrix[row].toarray().ravel()
+
+
+def dominant_topics(matrix: scipy.sparse.csr_matrix) -> np.ndarray:
+    """Returns the most probable topic of every document, or -1 if no probability was kept.
+
+    Args:
+        matrix (scipy.sparse.csr_matrix): matrix as returned by 'sparsify'.
+
+    Returns:
+        np.ndarray: one topic id per document.
+    """
+    topics = np.asarray(matrix.argmax(axis=1)).ravel()
+    topics[np.diff(matrix.indptr) == 0] = -1
+    return topics
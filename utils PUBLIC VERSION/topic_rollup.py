@@ -0,0 +1,208 @@
+"""Rolls the sentence level topic assignments up to the papers they come from.
+
+BERTopic is fitted on sentences (the exploded 'Abstract_split' column), so 'topics' and 'probs' have
+one entry per row of the sentence level DataFrame, whose index is the paper each sentence came from
+('DataFrame.explode' keeps the index). Paper ids are integer coded with 'pd.factorize' and every
+reduction is a 'np.bincount' or a sparse matrix product, rather than a 'groupby' + 'apply':
+
+    df_papers, mix = topic_rollup.paper_topics(df_orig, topics=topics, probs=probs_sparse)
+    df_papers['Year'] = topic_rollup.publication_year(df_meta.loc[df_papers.index, 'Date of Publication'])
+
+    topic_rollup.topic_shares(df_papers)                      # Papers per dominant topic, like 'get_topic_stats'.
+    topic_rollup.topic_shares(df_papers, mix=mix, by='Year')  # Topic mix share per year.
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+from .instrumentation import instrumented
+
+
+def _paper_codes(df_in: pd.DataFrame, paper_col: str | None) -> tuple[np.ndarray, pd.Index]:
+    """Integer codes the paper of every sentence, in order of first appearance.
+
+    Args:
+        df_in (pd.DataFrame): sentence level DataFrame.
+        paper_col (str | None): column holding the paper id, or None to use the index.
+
+    Returns:
+        tuple[np.ndarray, pd.Index]: the code of every sentence and the paper id of every code.
+    """
+    paper_ids = df_in.index if paper_col is None else df_in[paper_col]
+    codes, papers = pd.factorize(paper_ids, sort=False)
+    if (codes < 0).any():
+        raise ValueError("Every sentence must have a paper id.")
+    return codes, pd.Index(papers, name=paper_col if paper_col is not None else df_in.index.name)
+
+
+def _normalize_rows(matrix: scipy.sparse.csr_matrix) -> scipy.sparse.csr_matrix:
+    """Scales every row of a sparse matrix to sum to 1 (rows that are all zero are left as they are)."""
+    totals = np.asarray(matrix.sum(axis=1)).ravel()
+    scale = np.divide(1., totals, out=np.zeros_like(totals, dtype=np.float64), where=totals > 0)
+    return scipy.sparse.csr_matrix(scipy.sparse.diags(scale) @ matrix)
+
+
+@instrumented
+def paper_topics(df_in: pd.DataFrame, topics: np.ndarray | None = None, probs: scipy.sparse.csr_matrix | np.ndarray | None = None,
+                 paper_col: str | None = None) -> tuple[pd.DataFrame, scipy.sparse.csr_matrix]:
+    """Computes the topic mix and the dominant topic of every paper.
+
+    The topic mix of a paper is the mean of its sentences' topic probabilities if 'probs' is given
+    (e.g. the sparse matrix from 'topic_probabilities.sparsify'), otherwise the fraction of its
+    sentences assigned to each topic. Outlier sentences (topic -1) don't count towards the mix, which
+    is normalized to sum to 1 over the topics. The dominant topic is the topic with the largest share
+    of the mix (the lowest topic id on a tie), or -1 if all of the paper's sentences are outliers.
+
+    Args:
+        df_in (pd.DataFrame): sentence level DataFrame, one row per entry of 'topics' / 'probs'.
+        topics (np.ndarray | None, optional): topic of every sentence, as returned by BERTopic. Defaults to None.
+        probs (scipy.sparse.csr_matrix | np.ndarray | None, optional): topic probabilities of every
+            sentence, sentences by topics. Defaults to None.
+        paper_col (str | None, optional): column holding the paper id. Defaults to None (use the index).
+
+    Returns:
+        tuple[pd.DataFrame, scipy.sparse.csr_matrix]: one row per paper, indexed by paper id, with
+        the columns 'Topic' (dominant topic), 'Topic_Share' (its share of the mix), 'Sentences' and,
+        if 'topics' is given, 'Outlier_Sentences'; and the topic mix, papers by topics, in the same order.
+    """
+    if topics is None and probs is None:
+        raise ValueError("At least one of 'topics' and 'probs' must be given.")
+
+    codes, papers = _paper_codes(df_in, paper_col)
+    n_papers, n_sentences = len(papers), len(codes)
+
+    df_papers = pd.DataFrame({'Sentences': np.bincount(codes, minlength=n_papers)}, index=papers)
+
+    if topics is not None:
+        topics = np.asarray(topics)
+        if len(topics) != n_sentences:
+            raise ValueError(f"'topics' has {len(topics)} entries but 'df_in' has {n_sentences} rows.")
+        df_papers['Outlier_Sentences'] = np.bincount(codes[topics < 0], minlength=n_papers)
+
+    if probs is not None:
+        probs = scipy.sparse.csr_matrix(probs)
+        if probs.shape[0] != n_sentences:
+            raise ValueError(f"'probs' has {probs.shape[0]} rows but 'df_in' has {n_sentences} rows.")
+        # Paper by sentence indicator matrix, so the product sums the probabilities of each paper's
+        # sentences. Outlier sentences are left out of it, so their probabilities don't count.
+        assigned = topics >= 0 if topics is not None else np.ones(n_sentences, dtype=bool)
+        indicator = scipy.sparse.csr_matrix(
+            (np.ones(assigned.sum(), dtype=np.float32), (codes[assigned], np.flatnonzero(assigned))),
+            shape=(n_papers, n_sentences),
+        )
+        totals = indicator @ probs
+    else:
+        assigned = topics >= 0
+        totals = scipy.sparse.csr_matrix(
+            (np.ones(assigned.sum(), dtype=np.float32), (codes[assigned], topics[assigned])),
+            shape=(n_papers, topics.max() + 1 if assigned.any() else 0),
+        )
+
+    mix = _normalize_rows(totals)
+    mix.sum_duplicates()
+    # So that the papers with nothing in their mix have no stored entries at all.
+    mix.eliminate_zeros()
+
+    if mix.shape[1] > 0:
+        dominant = np.asarray(mix.argmax(axis=1)).ravel()
+        share = mix.max(axis=1).toarray().ravel()
+    else:
+        dominant, share = np.zeros(n_papers, dtype=np.int64), np.zeros(n_papers)
+    empty = np.diff(mix.indptr) == 0
+    dominant[empty] = -1
+    share[empty] = np.nan
+
+    df_papers.insert(0, 'Topic', dominant)
+    df_papers.insert(1, 'Topic_Share', share)
+    return df_papers, mix
+
+
+def publication_year(dates: pd.Series) -> pd.Series:
+    """Extracts the year from a MEDLINE date such as "2023 Dec 15" or "2023 Nov-Dec".
+
+    Args:
+        dates (pd.Series): the 'Date of Publication' column.
+
+    Returns:
+        pd.Series: the year, as a nullable integer.
+    """
+    return dates.astype('string').str.extract(r'(\d{4})', expand=False).astype('Int64')
+
+
+def _share_table(group_codes: np.ndarray, groups: pd.Index | None, topic_ids: np.ndarray, weights: np.ndarray | None) -> pd.DataFrame:
+    """Sums the weights per group and topic, and adds the 'Share' and 'CumulativeShare' columns.
+
+    Args:
+        group_codes (np.ndarray): code of the group of every entry.
+        groups (pd.Index | None): group of every code, or None if there is a single group.
+        topic_ids (np.ndarray): topic of every entry.
+        weights (np.ndarray | None): weight of every entry, or None to count the entries (as integers).
+
+    Returns:
+        pd.DataFrame: one row per group and topic with a non-zero count, sorted by group and then by
+        decreasing count.
+    """
+    # Shift the topic ids so the outlier topic (-1) can be counted too.
+    offset = min(topic_ids.min(initial=0), 0)
+    n_topics = topic_ids.max(initial=-1) - offset + 1
+    n_groups = len(groups) if groups is not None else 1
+
+    counts = np.bincount(group_codes * n_topics + (topic_ids - offset), weights=weights, minlength=n_groups * n_topics)
+    keys = np.flatnonzero(counts)
+    group_of, topic_of, count = keys // n_topics, keys % n_topics + offset, counts[keys]
+
+    # Sort by group, then by decreasing count (and by topic on a tie).
+    order = np.lexsort((topic_of, -count, group_of))
+    group_of, topic_of, count = group_of[order], topic_of[order], count[order]
+
+    group_totals = np.bincount(group_of, weights=count, minlength=n_groups)
+    cumulative = np.cumsum(count)
+    # Restart the cumulative sum at the first row of every group.
+    group_starts = np.r_[0, np.cumsum(np.bincount(group_of, minlength=n_groups))[:-1]]
+    cumulative -= np.r_[0, cumulative][group_starts][group_of]
+
+    df_out = pd.DataFrame({
+        'Topic': topic_of,
+        'Count': count,
+        'Share': 100. * count / group_totals[group_of],
+        'CumulativeShare': 100. * cumulative / group_totals[group_of],
+    })
+    if groups is None:
+        return df_out.set_index('Topic')
+    df_out.insert(0, groups.name, groups[group_of])
+    return df_out.set_index([groups.name, 'Topic'])
+
+
+def topic_shares(df_papers: pd.DataFrame, mix: scipy.sparse.csr_matrix | None = None, by: str | pd.Series | None = None) -> pd.DataFrame:
+    """Counts the papers per topic, overall or per group (e.g. year or journal), like 'get_topic_stats'.
+
+    Without 'mix' every paper counts once, towards its dominant topic (papers whose sentences are
+    all outliers count towards topic -1). With 'mix' every paper's count is split between topics
+    according to its topic mix, so the counts are fractional (and papers whose sentences are all
+    outliers are left out).
+
+    Args:
+        df_papers (pd.DataFrame): paper level DataFrame as returned by 'paper_topics'.
+        mix (scipy.sparse.csr_matrix | None, optional): the topic mix returned by 'paper_topics'. Defaults to None.
+        by (str | pd.Series | None, optional): column of 'df_papers', or Series aligned with it, to
+            group the papers by. Defaults to None (a single group). Papers with no group are left out.
+
+    Returns:
+        pd.DataFrame: the columns 'Count', 'Share' and 'CumulativeShare' (both in percent of the
+        group), indexed by topic, or by group and topic, and sorted by decreasing count in each group.
+    """
+    if by is None:
+        group_codes, groups = np.zeros(len(df_papers), dtype=np.int64), None
+    else:
+        group_values = df_papers[by] if isinstance(by, str) else by.reindex(df_papers.index)
+        group_codes, uniques = pd.factorize(group_values, sort=True)
+        groups = pd.Index(uniques, name=group_values.name)
+
+    if mix is None:
+        topic_ids = df_papers['Topic'].to_numpy()
+        keep = group_codes >= 0
+        return _share_table(group_codes[keep], groups, topic_ids[keep], None)
+
+    mix = mix.tocoo()
+    keep = group_codes[mix.row] >= 0
+    return _share_table(group_codes[mix.row][keep], groups, mix.col[keep].astype(np.int64), mix.data[keep].astype(np.float64))